@@ -45,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'social.profiling.SQLProfilerMiddleware',   # no-op unless SQL_PROFILER['ENABLED']
 ]
 
 # ─── Custom User Model ───────────────────────────────────────────────────────
@@ -124,6 +125,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'social.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -143,9 +148,73 @@ CORS_ALLOWED_ORIGINS = [
 ]
 CORS_ALLOW_CREDENTIALS = True
 
+# ─── Caching ──────────────────────────────────────────────────────────────────
+# Shared tier, visible to every worker process.  The file-based cache is a
+# single-host stand-in for local use; in production point 'default' at Redis
+# (django.core.cache.backends.redis.RedisCache) or Memcached.
+CACHES = {
+    'default': {
+        # FileBasedCache with add()/incr() made atomic across worker processes.
+        'BACKEND': 'social.cache.AtomicFileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# In-process LRU in front of CACHES[ALIAS] plus stampede protection; see social/cache.py.
+SOCIAL_CACHE = {
+    'ALIAS': 'default',
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 2,                 # seconds a worker may serve a value without asking the shared tier
+    'EARLY_EXPIRATION_BETA': 1.0,   # >1 refreshes earlier, 0 disables early expiration
+    'LOCK_TIMEOUT': 10,             # recompute lock lifetime; also how long stale values are kept
+}
+
+# ─── SQL Profiling ───────────────────────────────────────────────────────────
+# Opt-in per-query profiler (social/profiling.py); report with `manage.py sql_report`.
+SQL_PROFILER = {
+    'ENABLED': False,
+    'SLOW_MS': 100,                               # log statements at least this slow...
+    'EXPLAIN': True,                              # ...with their EXPLAIN plan attached
+    'SLOW_LOG': BASE_DIR / 'logs' / 'slow_queries.log',
+    'STATS_DIR': BASE_DIR / 'logs' / 'sqlprofile',
+    'FLUSH_INTERVAL': 30,                         # seconds between per-worker stats dumps
+}
+
+# ─── Write Batching ───────────────────────────────────────────────────────────
+# Queue comment/like/message writes and commit them together, one transaction
+# per WINDOW_MS per worker (social/writes.py).  `loadtest_writes --serve`
+# toggles it through the WRITE_BATCHING environment variable.
+WRITE_BATCHING = {
+    'ENABLED': os.environ.get('WRITE_BATCHING') == '1',
+    'WINDOW_MS': 5,
+    'MAX_BATCH': 64,
+    'TIMEOUT': 30,                  # seconds a request waits for its batch to commit
+}
+
+# ─── Message Archival ────────────────────────────────────────────────────────
+# Messages older than this are moved to the archive table by `archive_messages`.
+MESSAGE_ARCHIVE_AFTER_DAYS = 90
+
 # ─── Media Files ──────────────────────────────────────────────────────────────
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Set to 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (Apache) to let the proxy
+# stream media files; see social/media.py.  X-Sendfile is sent the absolute
+# file path; X-Accel-Redirect is sent MEDIA_SENDFILE_PREFIX + the file name, so
+# point the prefix at an `internal` nginx location aliased to MEDIA_ROOT.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_SENDFILE_PREFIX = MEDIA_URL
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'social.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 # ─── Static Files ─────────────────────────────────────────────────────────────
 STATIC_URL = '/static/'
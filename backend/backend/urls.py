@@ -1,11 +1,12 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
+from social.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('social.urls')),
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', serve_media, name='media'),
+]
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Message archival.
+
+``archive_messages`` moves messages older than ``MESSAGE_ARCHIVE_AFTER_DAYS``
+out of the hot ``Message`` table into ``ArchivedMessage`` in short batches
+(copy + raw ``DELETE`` per transaction), keeping the hot table bounded.
+
+``thread_page`` serves a conversation newest-first with an id cursor.  Message
+ids grow with time and archived rows keep their ids, so a page is read from the
+hot table first and only falls through to the archive once the hot rows run
+out — i.e. when the client has scrolled back past what the hot table holds.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedMessage, Message
+from .purge import DEFAULT_BATCH_SIZE, raw_delete
+from .rendering import MESSAGE_COLUMNS
+
+ARCHIVE_FIELDS = ('id', 'sender_id', 'receiver_id', 'content', 'is_read', 'created_at')
+
+
+def archive_messages(older_than_days=None, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Move old messages into the archive; returns how many were moved."""
+    if older_than_days is None:
+        older_than_days = settings.MESSAGE_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    old = Message.objects.filter(created_at__lt=cutoff).order_by('pk').values(*ARCHIVE_FIELDS)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(old[:batch_size])
+            if not batch:
+                break
+            # ignore_conflicts makes a re-run after a crash between copy and delete safe.
+            ArchivedMessage.objects.bulk_create(
+                [ArchivedMessage(**row) for row in batch], ignore_conflicts=True
+            )
+            raw_delete(Message, [row['id'] for row in batch])
+        moved += len(batch)
+        if report is not None:
+            report(moved)
+    return moved
+
+
+def _thread(model, user_id, other_id):
+    return model.objects.filter(
+        Q(sender_id=user_id, receiver_id=other_id) | Q(sender_id=other_id, receiver_id=user_id)
+    )
+
+
+def thread_page(user_id, other_id, before=None, page_size=20):
+    """
+    Return ``(rows, next_before)``: up to ``page_size`` ``MESSAGE_COLUMNS`` rows
+    older than message id ``before``, in chronological order, and the cursor
+    for the next (older) page or ``None``.
+    """
+    wanted = page_size + 1
+    hot = _thread(Message, user_id, other_id)
+    if before is not None:
+        hot = hot.filter(id__lt=before)
+    rows = list(hot.order_by('-id').values_list(*MESSAGE_COLUMNS)[:wanted])
+
+    if len(rows) < wanted:
+        cold = _thread(ArchivedMessage, user_id, other_id)
+        floor = rows[-1][0] if rows else before
+        if floor is not None:
+            cold = cold.filter(id__lt=floor)
+        rows += cold.order_by('-id').values_list(*MESSAGE_COLUMNS)[:wanted - len(rows)]
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    rows.reverse()
+    return rows, (rows[0][0] if has_more else None)
+
+
+def conversation_partner_ids(user_id):
+    """Ids of everyone ``user_id`` has exchanged messages with, hot or archived."""
+    partners = set()
+    for model in (Message, ArchivedMessage):
+        partners.update(model.objects.filter(sender_id=user_id).order_by()
+                        .values_list('receiver_id', flat=True).distinct())
+        partners.update(model.objects.filter(receiver_id=user_id).order_by()
+                        .values_list('sender_id', flat=True).distinct())
+    partners.discard(user_id)
+    return partners
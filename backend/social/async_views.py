@@ -0,0 +1,144 @@
+"""
+Native async (ASGI) versions of the read-heavy endpoints.
+
+DRF viewsets are sync-only, so under ASGI every request to them is handed to a
+worker thread.  The plain Django ``async def`` views below authenticate the JWT
+without a thread hop, use the async ORM, and ``asyncio.gather`` the independent
+queries of a request.  Payloads match the sync endpoints exactly:
+
+    GET /api/async/posts/feed/              ↔  /api/posts/feed/
+    GET /api/async/posts/<id>/              ↔  /api/posts/<id>/
+    GET /api/async/messages/?with=<id>      ↔  /api/messages/?with=<id>
+    GET /api/async/messages/conversations/  ↔  /api/messages/conversations/
+
+Note that Django runs async ORM calls on its thread-sensitive executor, so the
+gathered queries overlap with other requests' I/O rather than running in
+parallel on one connection.
+"""
+
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import archive, ranking, rendering
+from .models import ArchivedMessage, Message, Post
+from .renderers import ORJSONRenderer
+
+User = get_user_model()
+
+_jwt = JWTAuthentication()
+_renderer = ORJSONRenderer()
+
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+
+async def _authenticate(request):
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        token = _jwt.get_validated_token(raw_token)
+    except AuthenticationFailed:
+        return None
+    lookup = {jwt_settings.USER_ID_FIELD: token.get(jwt_settings.USER_ID_CLAIM), 'is_active': True}
+    return await User.objects.filter(**lookup).afirst()
+
+
+def async_api_view(view):
+    """GET-only, JWT-authenticated async view returning JSON; passes ``user`` through."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return _json({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        user = await _authenticate(request)
+        if user is None:
+            return _json({'detail': 'Authentication credentials were not provided.'}, status=401)
+        result = await view(request, user, *args, **kwargs)
+        return result if isinstance(result, HttpResponse) else _json(result)
+    return wrapper
+
+
+@async_api_view
+async def feed(request, user):
+    if request.GET.get('order') == 'recent':
+        post_ids = [pk async for pk in Post.objects.values_list('pk', flat=True)]
+    else:
+        post_ids = await sync_to_async(ranking.feed_post_ids)(user)
+    return await rendering.arender_posts(post_ids, request, user=user)
+
+
+@async_api_view
+async def post_detail(request, user, pk):
+    data = await rendering.arender_posts([pk], request, user=user)
+    if not data:
+        return _json({'detail': 'No Post matches the given query.'}, status=404)
+    return data[0]
+
+
+@async_api_view
+async def conversations(request, user):
+    partner_lists = await asyncio.gather(*(
+        rendering.alist(model.objects.filter(**{own: user}).order_by()
+                        .values_list(other, flat=True).distinct())
+        for model in (Message, ArchivedMessage)
+        for own, other in (('sender', 'receiver_id'), ('receiver', 'sender_id'))
+    ))
+    user_ids = set().union(*partner_lists) - {user.pk}
+    rows = await rendering.alist(User.objects.filter(id__in=user_ids).values_list(*rendering.USER.columns))
+    return [rendering.build_user(row, request) for row in rows]
+
+
+@async_api_view
+async def messages(request, user):
+    other_id = request.GET.get('with')
+    if other_id:
+        before = request.GET.get('before')
+        if not other_id.isdigit() or (before is not None and not before.isdigit()):
+            return _json({'detail': '"with" and "before" must be ids.'}, status=400)
+        rows, next_before = await sync_to_async(archive.thread_page)(
+            user.pk, int(other_id), int(before) if before else None, api_settings.PAGE_SIZE
+        )
+        url = request.build_absolute_uri()
+        return {
+            'next': replace_query_param(url, 'before', next_before) if next_before is not None else None,
+            'results': [rendering.build_message(row, request) for row in rows],
+        }
+
+    qs = Message.objects.filter(Q(sender=user) | Q(receiver=user))
+
+    page_param = request.GET.get('page', '1')
+    page = int(page_param) if page_param.isdigit() else 0
+    if page < 1:
+        return _json({'detail': 'Invalid page.'}, status=404)
+    page_size = api_settings.PAGE_SIZE
+    offset = (page - 1) * page_size
+
+    count, rows = await asyncio.gather(
+        qs.acount(),
+        rendering.alist(qs.values_list(*rendering.MESSAGE_COLUMNS)[offset:offset + page_size]),
+    )
+    if page > 1 and not rows:
+        return _json({'detail': 'Invalid page.'}, status=404)
+
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if offset + page_size < count else None,
+        'previous': previous,
+        'results': [rendering.build_message(row, request) for row in rows],
+    }
@@ -0,0 +1,362 @@
+"""
+Tiered cache with stampede protection.
+
+``TieredCache`` puts a small in-process LRU (``LOCAL_TTL`` seconds) in front of
+the shared Django cache named by ``SOCIAL_CACHE['ALIAS']``, so a hot key costs a
+dict lookup in the common case and one shared-cache round trip per worker per
+``LOCAL_TTL`` otherwise.
+
+``get_or_set`` protects the recompute path three ways:
+
+* **Single flight** — concurrent misses on one key inside a process wait for
+  the first caller's result instead of computing it again; across processes a
+  short ``add()`` lock in the shared tier plays the same role.
+* **Probabilistic early expiration** (XFetch) — each read recomputes early with
+  a probability that rises as expiry approaches, scaled by how long the value
+  took to compute (``EARLY_EXPIRATION_BETA``), so refreshes spread out instead
+  of every reader missing at the same instant.
+* **Stale while revalidate** — entries outlive their expiry by
+  ``LOCK_TIMEOUT`` in the shared tier; while one caller recomputes, everyone
+  else is served the previous value.
+
+Counters are kept per process (``stats()``) and folded into the shared tier
+every ``METRICS_FLUSH_INTERVAL`` seconds, where ``cluster_stats()`` (and the
+``cache_stats`` command) read the totals for all workers.
+
+Both the cross-process lock and the counters rely on ``add()`` and ``incr()``
+being atomic in the shared tier.  Django's ``FileBasedCache`` implements them as
+check-then-write, so the default ``CACHES`` entry uses ``AtomicFileBasedCache``,
+which runs them under a per-key ``O_CREAT | O_EXCL`` lock file.
+"""
+
+import math
+import os
+import pickle
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+METRICS = ('local_hits', 'shared_hits', 'misses', 'early_refreshes', 'stale_served',
+           'coalesced', 'computes', 'compute_ms')
+METRICS_FLUSH_INTERVAL = 30
+LOCK_POLL_INTERVAL = 0.05
+
+
+class AtomicFileBasedCache(FileBasedCache):
+    """
+    ``FileBasedCache`` whose ``add()`` / ``incr()`` / ``decr()`` are atomic
+    across processes sharing the directory.  Each runs while holding
+    ``<entry>.lock``, created with ``O_CREAT | O_EXCL`` so exactly one process
+    can own it; a lock older than ``KEY_LOCK_STALE`` seconds is assumed to
+    belong to a crashed process and broken.  ``incr()`` keeps the entry's
+    expiry instead of resetting it to the default timeout.
+    """
+    KEY_LOCK_STALE = 10
+    KEY_LOCK_POLL = 0.001
+
+    @contextmanager
+    def _key_lock(self, key, version):
+        self._createdir()
+        path = self._key_to_file(key, version) + '.lock'
+        while True:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(path).st_mtime > self.KEY_LOCK_STALE:
+                        os.remove(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                time.sleep(self.KEY_LOCK_POLL)
+        try:
+            yield
+        finally:
+            os.remove(path)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._key_lock(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._key_lock(key, version):
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                expiry = 0              # missing or empty: expired, as in FileBasedCache
+            if expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            try:
+                with open(fd, 'wb') as f:
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+                os.replace(tmp_path, fname)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return value
+
+
+class LocalLRU:
+    """Thread-safe bounded LRU whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries=1024, ttl=2.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            local_expiry, entry = item
+            if local_expiry <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, entry)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'ok')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.ok = False
+
+
+class TieredCache:
+    """
+    Entries are ``(value, expires_at, delta)``: wall-clock expiry and the
+    seconds the value took to compute (the XFetch scale factor).
+    """
+
+    def __init__(self, alias='default', local_max_entries=1024, local_ttl=2.0,
+                 beta=1.0, lock_timeout=10, key_prefix='social'):
+        self.alias = alias
+        self.local = LocalLRU(local_max_entries, local_ttl)
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.key_prefix = key_prefix
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._metrics = Counter()
+        self._unflushed = Counter()
+        self._metrics_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_settings(cls):
+        conf = getattr(settings, 'SOCIAL_CACHE', {})
+        return cls(
+            alias=conf.get('ALIAS', 'default'),
+            local_max_entries=conf.get('LOCAL_MAX_ENTRIES', 1024),
+            local_ttl=conf.get('LOCAL_TTL', 2.0),
+            beta=conf.get('EARLY_EXPIRATION_BETA', 1.0),
+            lock_timeout=conf.get('LOCK_TIMEOUT', 10),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f'{self.key_prefix}:{key}'
+
+    # ─── Plain access ────────────────────────────────────────────────────────
+
+    def get(self, key, default=None):
+        entry = self._lookup(key)
+        if entry is None or entry[1] <= time.time():
+            return default
+        return entry[0]
+
+    def set(self, key, value, timeout, delta=0.0):
+        entry = (value, time.time() + timeout, delta)
+        # Keep the shared copy past expiry so it can be served while refreshing.
+        self.shared.set(self._key(key), entry, timeout + self.lock_timeout)
+        self.local.set(key, entry)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(self._key(key))
+
+    def _lookup(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        entry = self.shared.get(self._key(key))
+        if entry is not None:
+            self.local.set(key, entry)
+        return entry
+
+    # ─── Read-through with stampede protection ───────────────────────────────
+
+    def get_or_set(self, key, compute, timeout):
+        """Return the cached value for ``key``, calling ``compute()`` at most once per refresh."""
+        now = time.time()
+        entry = self.local.get(key)
+        if entry is not None and not self._should_refresh(entry, now):
+            self._count('local_hits')
+            return entry[0]
+        entry = self.shared.get(self._key(key))
+        if entry is not None:
+            self.local.set(key, entry)
+            if not self._should_refresh(entry, now):
+                self._count('shared_hits')
+                return entry[0]
+            self._count('early_refreshes' if entry[1] > now else 'misses')
+        else:
+            self._count('misses')
+        return self._refresh(key, compute, timeout, stale=entry)
+
+    def _should_refresh(self, entry, now):
+        _, expires_at, delta = entry
+        # XFetch: -log(U) is Exp(1)-distributed, so early refreshes get likelier near expiry.
+        return now - delta * self.beta * math.log(1.0 - random.random()) >= expires_at
+
+    def _refresh(self, key, compute, timeout, stale):
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if stale is not None:
+                self._count('stale_served')
+                return stale[0]
+            flight.done.wait(self.lock_timeout)
+            if flight.ok:
+                self._count('coalesced')
+                return flight.value
+            return self._compute(key, compute, timeout)
+
+        try:
+            flight.value = self._refresh_shared(key, compute, timeout, stale)
+            flight.ok = True
+            return flight.value
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _refresh_shared(self, key, compute, timeout, stale):
+        lock_key = self._key(f'{key}:lock')
+        if self.shared.add(lock_key, 1, self.lock_timeout):
+            try:
+                return self._compute(key, compute, timeout)
+            finally:
+                self.shared.delete(lock_key)
+
+        # Another process is computing this key.
+        if stale is not None:
+            self._count('stale_served')
+            return stale[0]
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = self.shared.get(self._key(key))
+            if entry is not None and entry[1] > time.time():
+                self.local.set(key, entry)
+                self._count('coalesced')
+                return entry[0]
+        return self._compute(key, compute, timeout)
+
+    def _compute(self, key, compute, timeout):
+        started = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - started
+        self.set(key, value, timeout, delta)
+        self._count('computes')
+        self._count('compute_ms', round(delta * 1000))
+        return value
+
+    # ─── Metrics ─────────────────────────────────────────────────────────────
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+            self._unflushed[name] += amount
+            due = time.monotonic() - self._last_flush >= METRICS_FLUSH_INTERVAL
+        if due:
+            self.flush_metrics()
+
+    def stats(self):
+        """This process's counters plus ``hit_ratio`` and the local tier size."""
+        with self._metrics_lock:
+            data = {name: self._metrics[name] for name in METRICS}
+        return _with_ratio(data) | {'local_entries': len(self.local)}
+
+    def flush_metrics(self):
+        """Add this process's counters since the last flush to the shared totals."""
+        with self._metrics_lock:
+            pending, self._unflushed = self._unflushed, Counter()
+            self._last_flush = time.monotonic()
+        for name, amount in pending.items():
+            if not amount:
+                continue
+            key = self._key(f'metrics:{name}')
+            try:
+                self.shared.incr(key, amount)
+            except ValueError:
+                if not self.shared.add(key, amount, None):
+                    self.shared.incr(key, amount)
+
+    def cluster_stats(self):
+        """Counters flushed by every process sharing this cache."""
+        keys = {self._key(f'metrics:{name}'): name for name in METRICS}
+        found = self.shared.get_many(list(keys))
+        return _with_ratio({name: found.get(key, 0) for key, name in keys.items()})
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._metrics.clear()
+            self._unflushed.clear()
+        self.shared.delete_many([self._key(f'metrics:{name}') for name in METRICS])
+
+
+def _with_ratio(data):
+    hits = data['local_hits'] + data['shared_hits']
+    lookups = hits + data['misses'] + data['early_refreshes']
+    data['hit_ratio'] = round(hits / lookups, 4) if lookups else None
+    return data
+
+
+cache = TieredCache.from_settings()
@@ -0,0 +1,76 @@
+"""
+Optimistic post editing.
+
+Every post carries a ``version`` that is bumped on each edit.  Clients send the
+version they edited in ``If-Match``; ``edit_post`` applies the change with a
+single conditional ``UPDATE ... WHERE id = %s AND version = %s``, so two
+concurrent edits can never silently overwrite each other — the loser gets
+``412 Precondition Failed`` with the current version and must re-read.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Post
+from .purge import remove_orphaned_media
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The post was changed by someone else; reload it and retry.'
+    default_code = 'precondition_failed'
+
+    def __init__(self, current_version):
+        super().__init__()
+        self.detail = {'detail': self.detail, 'version': current_version}
+
+
+def etag(version):
+    return f'"{version}"'
+
+
+def parse_if_match(header):
+    """Expected version from an ``If-Match`` header; ``None`` for absent or ``*``."""
+    if header is None or header.strip() == '*':
+        return None
+    tag = header.split(',')[0].strip().removeprefix('W/').strip('"')
+    if not tag.isdigit():
+        raise ValidationError({'If-Match': 'Expected a post version, e.g. If-Match: "3".'})
+    return int(tag)
+
+
+def edit_post(post, changes, expected_version=None):
+    """
+    Apply ``changes`` (validated ``content`` / ``image``) to ``post`` if it is
+    still at ``expected_version`` (any version when ``None``); returns ``post``
+    refreshed with its new version.
+    """
+    changes = dict(changes)
+    old_image = post.image.name if post.image else None
+    new_image = None
+    if 'image' in changes:
+        upload = changes['image']
+        if upload:
+            field = Post._meta.get_field('image')
+            new_image = field.storage.save(field.generate_filename(post, upload.name), upload)
+        changes['image'] = new_image
+
+    queryset = Post.objects.filter(pk=post.pk)
+    if expected_version is not None:
+        queryset = queryset.filter(version=expected_version)
+    with transaction.atomic():
+        updated = queryset.update(**changes, version=F('version') + 1, updated_at=timezone.now())
+        if updated and 'image' in changes and old_image and old_image != new_image:
+            transaction.on_commit(lambda: remove_orphaned_media([old_image]))
+
+    if not updated:
+        if new_image:
+            remove_orphaned_media([new_image])
+        current = Post.objects.filter(pk=post.pk).values_list('version', flat=True).first()
+        raise PreconditionFailed(current)
+
+    post.refresh_from_db(fields=['content', 'image', 'version', 'updated_at'])
+    return post
@@ -0,0 +1,35 @@
+"""
+Management command: archive_messages
+-------------------------------------
+Usage:
+    python manage.py archive_messages                  # older than MESSAGE_ARCHIVE_AFTER_DAYS
+    python manage.py archive_messages --days 30
+    python manage.py archive_messages --batch-size 200
+
+Moves old messages from the hot ``Message`` table into ``ArchivedMessage`` in
+short transactions (see ``social.archive``). Safe to re-run or interrupt; run it
+periodically (cron) to keep the hot table bounded.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social.archive import archive_messages
+from social.purge import DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Move messages older than the retention window into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MESSAGE_ARCHIVE_AFTER_DAYS,
+                            help='Archive messages older than this many days.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'📦 Archiving messages older than {options["days"]} days...')
+        moved = archive_messages(options['days'], options['batch_size'], report=self._report)
+        self.stdout.write(self.style.SUCCESS(f'   ✅ Done — {moved} messages archived.'))
+
+    def _report(self, moved):
+        self.stdout.write(f'   {moved:>8} moved')
@@ -0,0 +1,143 @@
+"""
+Management command: bench_cache
+--------------------------------
+Usage:
+    python manage.py bench_cache [--threads 32] [--compute-ms 200] [--duration 5] [--ttl 1] [--think-ms 1] \\
+        [--processes 1]
+
+Stampede test for ``social.cache``: ``--threads`` readers hammer one key whose
+value takes ``--compute-ms`` to build and expires every ``--ttl`` seconds.
+Compares a naive get / compute / set loop on the shared backend against
+``TieredCache.get_or_set`` and reports how often the value was recomputed,
+plus the reader latency.  Readers pause ``--think-ms`` between reads like
+request handlers would; with no pause, lock convoys between spinning threads
+dominate the tail latency of both strategies.  Uses a private LocMem backend, so it is safe to run
+anywhere.
+
+With ``--processes N`` (N > 1) that many forked processes each run
+``--threads`` readers against a private ``AtomicFileBasedCache`` in a temporary
+directory, the way gunicorn workers share the default cache.  Only the
+shared-tier ``add()`` lock then keeps processes from recomputing together, so
+``computes`` shows whether it holds across processes.
+"""
+
+import multiprocessing
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from social.cache import METRICS, TieredCache
+
+BENCH_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-default'},
+    'bench': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-cache'},
+}
+
+
+def _file_caches(directory):
+    return {
+        'default': BENCH_CACHES['default'],
+        'bench': {'BACKEND': 'social.cache.AtomicFileBasedCache', 'LOCATION': directory},
+    }
+
+
+def _bench(strategy, options):
+    """Run one strategy in this process; returns ``(computes, latencies, tiered stats)``."""
+    shared = caches['bench']
+    tiered = TieredCache(alias='bench', local_ttl=0.5, lock_timeout=5)
+    computes = [0]
+    lock = threading.Lock()
+    compute_s = options['compute_ms'] / 1000
+
+    def compute():
+        with lock:
+            computes[0] += 1
+        time.sleep(compute_s)
+        return 'value'
+
+    if strategy == 'naive':
+        def read():
+            value = shared.get('bench:key')
+            if value is None:
+                value = compute()
+                shared.set('bench:key', value, options['ttl'])
+            return value
+    else:
+        def read():
+            return tiered.get_or_set('bench:key', compute, options['ttl'])
+
+    latencies = _run(read, options['threads'], options['duration'], options['think_ms'] / 1000)
+    return computes[0], latencies, tiered.stats()
+
+
+def _run(read, threads, duration, think):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        mine = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            read()
+            mine.append(time.perf_counter() - started)
+            time.sleep(think)
+        with lock:
+            latencies.extend(mine)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies
+
+
+class Command(BaseCommand):
+    help = "Benchmark cache stampede protection (naive vs. tiered get_or_set)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32, help='Readers per process.')
+        parser.add_argument('--compute-ms', type=float, default=200.0)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--ttl', type=float, default=1.0)
+        parser.add_argument('--think-ms', type=float, default=1.0)
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Reader processes sharing an on-disk cache (1: in-process LocMem).')
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        with tempfile.TemporaryDirectory(prefix='bench-cache-') as directory:
+            with override_settings(CACHES=BENCH_CACHES if processes == 1 else _file_caches(directory)):
+                self._compare(processes, options)
+
+    def _compare(self, processes, options):
+        self.stdout.write(f'{"strategy":<10} {"computes":>9} {"reads":>9} {"p50 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+        stats = {}
+        for name in ('naive', 'tiered'):
+            caches['bench'].clear()
+            if processes == 1:
+                results = [_bench(name, options)]
+            else:
+                # Forked children inherit the overridden CACHES.
+                context = multiprocessing.get_context('fork')
+                with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+                    results = list(pool.map(_bench, [name] * processes, [options] * processes))
+            computes = sum(result[0] for result in results)
+            latencies = [latency for result in results for latency in result[1]]
+            stats = {metric: sum(result[2][metric] for result in results) for metric in METRICS}
+            q = statistics.quantiles(latencies, n=100)
+            self.stdout.write(f'{name:<10} {computes:>9} {len(latencies):>9} '
+                              f'{q[49] * 1e3:>8.2f} {q[98] * 1e3:>8.2f} {max(latencies) * 1e3:>8.2f}')
+        hits = stats['local_hits'] + stats['shared_hits']
+        lookups = hits + stats['misses'] + stats['early_refreshes']
+        self.stdout.write(self.style.SUCCESS(
+            f'tiered: hit ratio {hits / lookups if lookups else 0:.2%}, coalesced {stats["coalesced"]}, '
+            f'stale served {stats["stale_served"]}, early refreshes {stats["early_refreshes"]}'
+        ))
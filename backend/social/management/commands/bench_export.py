@@ -0,0 +1,76 @@
+"""
+Management command: bench_export
+---------------------------------
+Usage:
+    python manage.py bench_export [--rows 20000 100000] [--chunk-size 2000]
+
+Inserts synthetic messages inside a transaction that is rolled back, exports
+them with ``social.export`` and reports rows/sec plus peak Python memory
+(tracemalloc) per run. Peak memory should stay roughly constant as the row
+count grows; throughput is per format.
+"""
+
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from social.export import DEFAULT_CHUNK_SIZE, TABLES, WRITERS
+from social.models import Message
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark streaming export throughput (rows/sec) and peak memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[20000, 100000])
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        formats = ['ndjson']
+        try:
+            import pyarrow  # noqa: F401
+            formats.append('parquet')
+        except ImportError:
+            self.stdout.write(self.style.WARNING('pyarrow not installed; benchmarking NDJSON only.'))
+
+        self.stdout.write(f'{"rows":>9}  {"format":<8} {"rows/s":>10} {"peak MiB":>9} {"file KiB":>9}')
+        for n_rows in options['rows']:
+            with transaction.atomic():
+                self._seed(n_rows)
+                for fmt in formats:
+                    rate, peak, size = self._export(fmt, options['chunk_size'])
+                    self.stdout.write(f'{n_rows:>9}  {fmt:<8} {rate:>10,.0f} {peak / 2**20:>9.1f} {size / 1024:>9.0f}')
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def _seed(n_rows):
+        a = User.objects.create(username='bench_export_a')
+        b = User.objects.create(username='bench_export_b')
+        Message.objects.all().delete()
+        Message.objects.bulk_create(
+            (Message(sender=a if i % 2 else b, receiver=b if i % 2 else a,
+                     content=f'Benchmark message number {i} with a little padding text.')
+             for i in range(n_rows)),
+            batch_size=5000,
+        )
+
+    @staticmethod
+    def _export(fmt, chunk_size):
+        writer, suffix = WRITERS[fmt]
+        model, columns = TABLES['message']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f'message{suffix}'
+            tracemalloc.start()
+            started = time.perf_counter()
+            rows = writer(path, model.objects.all(), columns, chunk_size)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return rows / elapsed, peak, path.stat().st_size
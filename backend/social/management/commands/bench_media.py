@@ -0,0 +1,81 @@
+"""
+Management command: bench_media
+--------------------------------
+Usage:
+    python manage.py bench_media [--sizes 16384 1048576] [--duration 2]
+
+Throughput of ``social.media.serve_media`` against Django's
+``django.views.static.serve`` (what ``static()`` mounted before), called
+in-process on temporary files so only view + body iteration cost is measured.
+Scenarios: full GET, revalidation (conditional GET) and a 64 KiB range GET.
+
+In-process numbers cannot show the ``sendfile()`` gain of ``FileResponse`` under
+a real WSGI server, nor the proxy offload of ``MEDIA_SENDFILE_HEADER``.
+"""
+
+import os
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views.static import serve as static_serve
+
+from social.media import serve_media
+from social.storage import ContentAddressedStorage
+
+
+def _consume(response):
+    if response.streaming:
+        total = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        total = len(response.content)
+    response.close()
+    return total
+
+
+class Command(BaseCommand):
+    help = "Benchmark media serving: serve_media vs. django.views.static.serve."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[16 * 1024, 1024 * 1024])
+        parser.add_argument('--duration', type=float, default=2.0, help='Seconds per scenario.')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        with tempfile.TemporaryDirectory() as root, override_settings(MEDIA_ROOT=root):
+            storage = ContentAddressedStorage(location=root)
+            self.stdout.write(f'{"size":>9}  {"scenario":<14} {"view":<12} {"req/s":>10} {"MB/s":>9} {"status":>6}')
+            for size in options['sizes']:
+                name = storage.save('bench/file.bin', ContentFile(os.urandom(size)))
+                probe = serve_media(factory.get('/'), name)
+                etag, last_modified = probe['ETag'], probe['Last-Modified']
+                probe.close()
+
+                scenarios = [
+                    ('full', {}),
+                    ('revalidate', {'HTTP_IF_NONE_MATCH': etag, 'HTTP_IF_MODIFIED_SINCE': last_modified}),
+                    ('range 64KiB', {'HTTP_RANGE': f'bytes=0-{min(size, 65536) - 1}'}),
+                ]
+                for label, headers in scenarios:
+                    for view_name, view in (('static.serve', static_serve), ('serve_media', serve_media)):
+                        request = factory.get(f'/media/{name}', **headers)
+                        call = (lambda v=view, r=request: v(r, name, document_root=root)) \
+                            if view is static_serve else (lambda v=view, r=request: v(r, name))
+                        rate, mbps, status = self._measure(call, options['duration'])
+                        self.stdout.write(f'{size:>9}  {label:<14} {view_name:<12} {rate:>10.0f} {mbps:>9.1f} {status:>6}')
+
+    @staticmethod
+    def _measure(call, duration):
+        response = call()
+        status = response.status_code
+        _consume(response)
+        requests, transferred = 0, 0
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        while time.perf_counter() < deadline:
+            transferred += _consume(call())
+            requests += 1
+        elapsed = time.perf_counter() - started
+        return requests / elapsed, transferred / elapsed / 1e6, status
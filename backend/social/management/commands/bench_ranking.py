@@ -0,0 +1,79 @@
+"""
+Management command: bench_ranking
+----------------------------------
+Usage:
+    python manage.py bench_ranking [--candidates 1000] [--repeat 200]
+
+Measures the cost of scoring one batch of feed candidates with the vectorised
+NumPy path in ``social.ranking`` against an equivalent per-post Python loop.
+Uses synthetic feature columns, so no database rows are needed.
+"""
+
+import math
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from social import ranking
+
+
+def _score_python(age_hours, likes, comments, recent_likes, recent_comments, affinity):
+    """Reference per-post implementation of ``ranking.score_candidates``."""
+    scores = []
+    for i in range(len(age_hours)):
+        age = max(age_hours[i], 0.0)
+        recency = 2.0 ** (-age / ranking.HALF_LIFE_HOURS)
+        recent = recent_likes[i] + ranking.COMMENT_WEIGHT * recent_comments[i]
+        total = likes[i] + ranking.COMMENT_WEIGHT * comments[i]
+        velocity = math.log1p(recent / ranking.VELOCITY_WINDOW_HOURS + total / (age + 2.0))
+        scores.append(ranking.W_RECENCY * recency
+                      + ranking.W_VELOCITY * velocity
+                      + ranking.W_AFFINITY * affinity[i])
+    return scores
+
+
+class Command(BaseCommand):
+    help = "Benchmark feed ranking cost per batch of candidates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        n, repeat = options['candidates'], options['repeat']
+        rng = np.random.default_rng(0)
+        columns = (
+            rng.uniform(0, 24 * ranking.CANDIDATE_WINDOW_DAYS, n),
+            rng.poisson(20, n),
+            rng.poisson(5, n),
+            rng.poisson(2, n),
+            rng.poisson(1, n),
+            rng.uniform(0, 1, n),
+        )
+        py_columns = tuple(c.tolist() for c in columns)
+
+        vectorised = self._time(lambda: np.argsort(-ranking.score_candidates(*columns), kind='stable'), repeat)
+        python = self._time(
+            lambda: sorted(range(n), key=_score_python(*py_columns).__getitem__, reverse=True), repeat
+        )
+
+        assert np.allclose(ranking.score_candidates(*columns), _score_python(*py_columns))
+
+        per_k = 1000.0 / n
+        self.stdout.write(f'Candidates per batch : {n}  (repeat {repeat})')
+        self.stdout.write(f'NumPy   score+sort   : {vectorised * 1e6:9.1f} µs/batch  '
+                          f'{vectorised * 1e6 * per_k:9.1f} µs per 1,000 candidates')
+        self.stdout.write(f'Python  score+sort   : {python * 1e6:9.1f} µs/batch  '
+                          f'{python * 1e6 * per_k:9.1f} µs per 1,000 candidates')
+        self.stdout.write(self.style.SUCCESS(f'Speed-up            : {python / vectorised:.1f}×'))
+
+    @staticmethod
+    def _time(fn, repeat):
+        fn()
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,106 @@
+"""
+Management command: bench_serialization
+-----------------------------------------
+Usage:
+    python manage.py bench_serialization [--posts 100] [--comments 3] [--repeat 20]
+
+Compares rendering one page of posts through ``PostSerializer`` + DRF's
+``JSONRenderer`` against ``social.rendering.render_posts`` + ``ORJSONRenderer``.
+Synthetic users, posts, likes and comments are created inside a transaction
+that is rolled back afterwards, so the database is left untouched.
+"""
+
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from social.models import Comment, Like, Post
+from social.renderers import ORJSONRenderer
+from social.rendering import render_posts
+from social.serializers import PostSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark post page serialization: DRF serializers vs. the values()-based fast path."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100)
+        parser.add_argument('--comments', type=int, default=3, help='Comments per post.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options['posts'], options['comments'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _run(self, n_posts, n_comments, repeat):
+        users = User.objects.bulk_create(
+            User(username=f'bench_{i}', first_name=f'Bench{i}') for i in range(10)
+        )
+        posts = Post.objects.bulk_create(
+            Post(author=users[i % len(users)], content=f'Benchmark post {i} ' * 5) for i in range(n_posts)
+        )
+        Like.objects.bulk_create(
+            Like(user=user, post=post) for post in posts for user in users[: (post.pk % len(users)) + 1]
+        )
+        Comment.objects.bulk_create(
+            Comment(author=users[(post.pk + j) % len(users)], post=post, content=f'Comment {j}')
+            for post in posts for j in range(n_comments)
+        )
+        post_ids = [post.pk for post in posts]
+
+        django_request = APIRequestFactory().get('/api/posts/feed/')
+        force_authenticate(django_request, user=users[0])
+        request = Request(django_request)
+        request._user = users[0]
+        request._authenticator = None
+
+        def serializer_path():
+            qs = (Post.objects.filter(pk__in=post_ids)
+                  .select_related('author').prefetch_related('comments__author', 'likes'))
+            data = PostSerializer(qs, many=True, context={'request': request}).data
+            return JSONRenderer().render(data)
+
+        def fast_path():
+            return ORJSONRenderer().render(render_posts(post_ids, request))
+
+        slow_body, slow_queries = self._measure_queries(serializer_path)
+        fast_body, fast_queries = self._measure_queries(fast_path)
+        by_id = {item['id']: item for item in json.loads(slow_body)}
+        same = [by_id[item['id']] for item in json.loads(fast_body)] == [by_id[pk] for pk in post_ids]
+
+        slow = self._time(serializer_path, repeat)
+        fast = self._time(fast_path, repeat)
+
+        self.stdout.write(f'Page size            : {n_posts} posts, {n_comments} comments each (repeat {repeat})')
+        self.stdout.write(f'PostSerializer + DRF : {slow * 1000:8.2f} ms/page  {n_posts / slow:10.0f} posts/s  '
+                          f'{slow_queries} queries')
+        self.stdout.write(f'render_posts + orjson: {fast * 1000:8.2f} ms/page  {n_posts / fast:10.0f} posts/s  '
+                          f'{fast_queries} queries')
+        self.stdout.write(f'Identical payloads   : {"yes" if same else "NO"}')
+        self.stdout.write(self.style.SUCCESS(f'Speed-up             : {slow / fast:.1f}×'))
+
+    @staticmethod
+    def _measure_queries(fn):
+        with CaptureQueriesContext(connection) as ctx:
+            body = fn()
+        return body, len(ctx.captured_queries)
+
+    @staticmethod
+    def _time(fn, repeat):
+        fn()
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,33 @@
+"""
+Management command: cache_stats
+--------------------------------
+Usage:
+    python manage.py cache_stats            # totals flushed by every worker
+    python manage.py cache_stats --reset
+
+Prints the hit/miss counters of ``social.cache`` aggregated in the shared tier.
+Workers flush their counters every ``METRICS_FLUSH_INTERVAL`` seconds, so the
+most recent activity may not show up yet.
+"""
+
+from django.core.management.base import BaseCommand
+
+from social.cache import METRICS, cache
+
+
+class Command(BaseCommand):
+    help = "Show cluster-wide hit/miss counters of the tiered cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters.')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            cache.reset_metrics()
+            self.stdout.write(self.style.SUCCESS('Cache metrics reset.'))
+            return
+        stats = cache.cluster_stats()
+        for name in METRICS:
+            self.stdout.write(f'{name:<16} {stats[name]:>12}')
+        ratio = stats['hit_ratio']
+        self.stdout.write(f'{"hit_ratio":<16} {"-" if ratio is None else f"{ratio:.2%}":>12}')
@@ -0,0 +1,114 @@
+"""
+Management command: import_report
+----------------------------------
+Usage:
+    python manage.py import_report                  # project modules + per-package totals
+    python manage.py import_report --top 30         # also the 30 slowest modules overall
+    python manage.py import_report --no-urls        # stop after backend.wsgi (skip the URLconf)
+    python manage.py import_report --runs 5         # best-of-5 boot wall time
+    python manage.py import_report --why yaml       # which import chain loads a module
+
+Boots a worker in a fresh interpreter (``social.startup.measure_boot``) and
+reports where its import time goes:
+
+* every ``backend.*`` / ``social.*`` module, self and cumulative time;
+* self time summed per top-level package, with ``INSTALLED_APPS`` marked;
+* whether the libraries in ``LAZY_MODULES`` were pulled in at boot, and by whom.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social.startup import LAZY_MODULES, measure_boot
+
+PROJECT_PACKAGES = ('backend', 'social')
+
+
+def _ms(us):
+    return us / 1000.0
+
+
+class Command(BaseCommand):
+    help = "Report per-module import time of a cold worker boot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=0, help='Also list the N slowest modules by self time.')
+        parser.add_argument('--no-urls', action='store_true', help='Do not load the URLconf.')
+        parser.add_argument('--runs', type=int, default=3, help='Boots to time (best is reported).')
+        parser.add_argument('--why', action='append', default=[], metavar='MODULE',
+                            help='Show the import chain that first loaded MODULE (repeatable).')
+
+    def handle(self, *args, **options):
+        load_urls = not options['no_urls']
+        seconds, records = measure_boot(load_urls=load_urls)
+        for _ in range(options['runs'] - 1):
+            seconds = min(seconds, measure_boot(load_urls=load_urls, importtime=False)[0])
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Project modules'))
+        self.stdout.write(f'{"cumul ms":>9} {"self ms":>8}  module')
+        for record in records:
+            if record.package in PROJECT_PACKAGES:
+                self.stdout.write(f'{_ms(record.cumulative_us):>9.1f} {_ms(record.self_us):>8.1f}  {record.name}')
+
+        installed = {app.partition('.')[0] for app in settings.INSTALLED_APPS}
+        per_package = defaultdict(int)
+        for record in records:
+            per_package[record.package] += record.self_us
+        self.stdout.write(self.style.MIGRATE_HEADING('\nSelf time per top-level package'))
+        for package, us in sorted(per_package.items(), key=lambda item: -item[1])[:20]:
+            marker = '  (installed app)' if package in installed else ''
+            self.stdout.write(f'{_ms(us):>9.1f} ms  {package}{marker}')
+
+        if options['top']:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\nSlowest {options["top"]} modules (self time)'))
+            for record in sorted(records, key=lambda r: -r.self_us)[:options['top']]:
+                self.stdout.write(f'{_ms(record.self_us):>9.1f} ms  {record.name}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\nLazy modules'))
+        for module in LAZY_MODULES:
+            culprit = self._importer_of(records, module)
+            if culprit is None:
+                self.stdout.write(self.style.SUCCESS(f'   {module:<10} not imported at boot'))
+            else:
+                self.stdout.write(self.style.WARNING(f'   {module:<10} imported at boot via {culprit}'))
+
+        for module in options['why']:
+            chain = self._chain(records, module)
+            if chain is None:
+                self.stdout.write(f'\n{module}: not imported at boot')
+            else:
+                self.stdout.write(f'\n{module}: ' + ' <- '.join(chain))
+
+        total = sum(r.self_us for r in records)
+        self.stdout.write(self.style.SUCCESS(
+            f'\nBoot wall time: {seconds * 1000:.0f} ms (best of {options["runs"]}); '
+            f'{len(records)} modules, {_ms(total):.0f} ms importing'
+        ))
+
+    @staticmethod
+    def _chain(records, module):
+        """``[module, importer, importer's importer, ...]`` for the first import of ``module``."""
+        # importtime prints children before their parent, so the enclosing
+        # imports are the later lines with a smaller depth.
+        for index, record in enumerate(records):
+            if record.name != module:
+                continue
+            depth, chain = record.depth, [module]
+            for parent in records[index + 1:]:
+                if parent.depth < depth:
+                    chain.append(parent.name)
+                    depth = parent.depth
+            return chain
+        return None
+
+    def _importer_of(self, records, module):
+        """Nearest project module that (transitively) imported ``module``."""
+        chain = self._chain(records, module)
+        if chain is None:
+            return None
+        for name in chain[1:]:
+            if name.partition('.')[0] in PROJECT_PACKAGES:
+                return name
+        return chain[-1]
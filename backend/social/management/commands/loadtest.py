@@ -0,0 +1,128 @@
+"""
+Management command: loadtest
+-----------------------------
+Usage:
+    # terminal 1 – sync WSGI deployment
+    gunicorn backend.wsgi -w 4 -b 127.0.0.1:8000
+    # terminal 2 – ASGI deployment
+    uvicorn backend.asgi:application --workers 4 --port 8001
+    # terminal 3
+    python manage.py loadtest --user alice \\
+        --target sync=http://127.0.0.1:8000/api/ \\
+        --target async=http://127.0.0.1:8001/api/async/ \\
+        --path posts/feed/ --path messages/conversations/ --path "messages/?with=2"
+
+Drives every (target, path) pair with ``--concurrency`` keep-alive clients for
+``--duration`` seconds and reports requests/sec, error rate and latency
+percentiles, so the sync viewsets and the async views can be compared.
+"""
+
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _client_loop(url, token, deadline, latencies, errors, lock):
+    parts = urlsplit(url)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+    conn = conn_cls(parts.netloc, timeout=30)
+    local_latencies, local_errors = [], 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', target, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors += 1
+            else:
+                local_latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = conn_cls(parts.netloc, timeout=30)
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+
+class Command(BaseCommand):
+    help = "HTTP load test comparing sync (WSGI) and async (ASGI) endpoint deployments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='name=base_url, e.g. async=http://127.0.0.1:8001/api/async/ (repeatable).')
+        parser.add_argument('--path', action='append', required=True,
+                            help='Path relative to each target base URL (repeatable).')
+        parser.add_argument('--user', help='Username to mint a JWT for (uses this DB).')
+        parser.add_argument('--token', help='Use an existing access token instead of --user.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per (target, path).')
+
+    def handle(self, *args, **options):
+        token = options['token'] or self._mint_token(options['user'])
+        targets = []
+        for spec in options['target']:
+            name, sep, base = spec.partition('=')
+            if not sep:
+                raise CommandError(f'--target must look like name=url, got {spec!r}')
+            targets.append((name, base if base.endswith('/') else base + '/'))
+
+        self.stdout.write(f'{"target":<8} {"path":<32} {"req/s":>9} {"err%":>6} '
+                          f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8}')
+        for path in options['path']:
+            for name, base in targets:
+                row = self._run(urljoin(base, path), token, options['concurrency'], options['duration'])
+                self.stdout.write(
+                    f'{name:<8} {path:<32} {row["rps"]:9.1f} {row["error_rate"] * 100:6.2f} '
+                    f'{row["p50"]:8.1f} {row["p95"]:8.1f} {row["p99"]:8.1f} {row["max"]:8.1f}'
+                )
+
+    def _mint_token(self, username):
+        if not username:
+            raise CommandError('Pass --user or --token.')
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'No user named {username!r}.')
+        return str(RefreshToken.for_user(user).access_token)
+
+    @staticmethod
+    def _run(url, token, concurrency, duration):
+        latencies, errors, lock = [], [0], threading.Lock()
+        started = time.perf_counter()
+        deadline = started + duration
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(_client_loop, url, token, deadline, latencies, errors, lock)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        total = len(latencies) + errors[0]
+        ms = [value * 1000 for value in latencies]
+        return {
+            'rps': len(latencies) / elapsed,
+            'error_rate': errors[0] / total if total else 0.0,
+            'p50': statistics.median(ms) if ms else 0.0,
+            'p95': _percentile(ms, 0.95),
+            'p99': _percentile(ms, 0.99),
+            'max': ms[-1] if ms else 0.0,
+        }
@@ -0,0 +1,307 @@
+"""
+Management command: loadtest_writes
+------------------------------------
+Usage:
+    # Start a local server twice (direct writes, then WRITE_BATCHING=1) and compare
+    python manage.py loadtest_writes --serve
+
+    # Against a server you started yourself
+    python manage.py loadtest_writes --url http://127.0.0.1:8000/api/ \\
+        [--processes 4] [--clients 8] [--duration 10] [--burst 5] [--pause-ms 50] \\
+        [--mix comment=4,comment-create=2,like=3,message=1] [--users 32] [--post ID]
+
+Write-path load test.  ``--processes`` worker processes each run ``--clients``
+keep-alive clients that fire bursts of ``--burst`` writes back to back, then
+pause ``--pause-ms``.  Every comment and like targets the same post (a comment
+storm); messages go to another load-test user.  ``--mix`` weights the kinds:
+
+    comment         POST posts/{id}/comment/    (PostViewSet.comment)
+    comment-create  POST comments/              (CommentViewSet.create)
+    like            POST posts/{id}/like/       (toggle)
+    message         POST messages/
+
+Reports write throughput, commits per second, error rate (``503`` = database
+lock timeout), client latency and the server-side lock wait and batch size
+read from each response's ``Server-Timing`` header (see ``social/writes.py``).
+The lock-wait columns include the ``503`` responses, which report how long they
+waited before giving up, so timeouts raise the percentiles instead of
+dropping out of them.
+
+The ``writeload<N>`` users and the target post are created in this database if
+missing, so point it at a development database.  ``--serve`` runs
+``--server-cmd`` (default: ``runserver`` on ``--port``) once per ``--modes``
+entry with ``WRITE_BATCHING`` set accordingly.
+"""
+
+import http.client
+import json
+import os
+import random
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+KINDS = ('comment', 'comment-create', 'like', 'message')
+MODES = {'direct': '0', 'batched': '1'}
+DEFAULT_SERVER_CMD = '{python} manage.py runserver --noreload --skip-checks 127.0.0.1:{port}'
+
+_TIMING = re.compile(r'(db-lock|db-queue);dur=([\d.]+)|db-batch;desc="(\d+)"')
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _parse_timing(header):
+    lock_ms = queue_ms = None
+    batch = 1
+    for name, duration, size in _TIMING.findall(header or ''):
+        if size:
+            batch = int(size)
+        elif name == 'db-lock':
+            lock_ms = float(duration)
+        else:
+            queue_ms = float(duration)
+    return lock_ms, queue_ms, batch
+
+
+def _request(kind, post_id, receiver_id, sequence):
+    if kind == 'comment':
+        return f'posts/{post_id}/comment/', {'post': post_id, 'content': f'storm comment {sequence}'}
+    if kind == 'comment-create':
+        return 'comments/', {'post': post_id, 'content': f'storm comment {sequence}'}
+    if kind == 'like':
+        return f'posts/{post_id}/like/', {}
+    return 'messages/', {'receiver_id': receiver_id, 'content': f'burst message {sequence}'}
+
+
+def _post(conn, path, body, headers):
+    conn.request('POST', path, body=json.dumps(body), headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response
+
+
+def _client(base, token, receiver_id, plan, deadline, results, lock):
+    parts = urlsplit(base)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json',
+               'Accept': 'application/json'}
+    conn = conn_cls(parts.netloc, timeout=60)
+    kinds, weights = zip(*plan['mix'])
+    rng = random.Random()
+    local = {'latencies': [], 'lock_ms': [], 'queue_ms': [], 'commits': 0.0,
+             'ok': 0, 'locked': 0, 'failed': 0}
+    sequence = 0
+    while time.perf_counter() < deadline:
+        for _ in range(plan['burst']):
+            sequence += 1
+            path, body = _request(rng.choices(kinds, weights)[0], plan['post_id'], receiver_id, sequence)
+            started = time.perf_counter()
+            try:
+                try:
+                    response = _post(conn, parts.path + path, body, headers)
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    # The server closed an idle keep-alive connection; reconnect once.
+                    conn.close()
+                    response = _post(conn, parts.path + path, body, headers)
+            except (OSError, http.client.HTTPException):
+                local['failed'] += 1
+                conn.close()
+                conn = conn_cls(parts.netloc, timeout=60)
+                continue
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if response.status == 503:
+                local['locked'] += 1
+                lock_ms, _, _ = _parse_timing(response.getheader('Server-Timing'))
+                local['lock_ms'].append(elapsed_ms if lock_ms is None else lock_ms)
+            elif response.status >= 400:
+                local['failed'] += 1
+            else:
+                local['ok'] += 1
+                local['latencies'].append(elapsed_ms)
+                lock_ms, queue_ms, batch = _parse_timing(response.getheader('Server-Timing'))
+                if lock_ms is not None:
+                    local['lock_ms'].append(lock_ms)
+                if queue_ms is not None:
+                    local['queue_ms'].append(queue_ms)
+                local['commits'] += 1 / batch
+        time.sleep(plan['pause'])
+    conn.close()
+    with lock:
+        for key, value in local.items():
+            results[key] += value
+
+
+def _worker(base, clients, plan, duration):
+    """One load process: ``clients`` is a list of ``(token, receiver_id)``."""
+    deadline = time.perf_counter() + duration
+    results = {'latencies': [], 'lock_ms': [], 'queue_ms': [], 'commits': 0.0,
+               'ok': 0, 'locked': 0, 'failed': 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=_client, args=(base, token, receiver_id, plan, deadline, results, lock))
+               for token, receiver_id in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class Command(BaseCommand):
+    help = "Concurrent comment/like/message write load test with SQLite lock metrics."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/',
+                            help='API base URL of a running server (ignored with --serve).')
+        parser.add_argument('--serve', action='store_true',
+                            help='Start the server itself, once per --modes entry.')
+        parser.add_argument('--modes', default='direct,batched',
+                            help='With --serve: comma-separated subset of direct,batched.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--server-cmd', default=DEFAULT_SERVER_CMD,
+                            help='With --serve: server command; {python} and {port} are substituted.')
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--clients', type=int, default=8, help='Clients per process.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+        parser.add_argument('--burst', type=int, default=5, help='Writes per burst.')
+        parser.add_argument('--pause-ms', type=float, default=50.0, help='Pause between bursts.')
+        parser.add_argument('--mix', default='comment=4,comment-create=2,like=3,message=1')
+        parser.add_argument('--users', type=int, default=32)
+        parser.add_argument('--post', type=int, help='Target post id (default: a load-test post).')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        clients = self._clients(options['users'], options['processes'] * options['clients'])
+        plan = {
+            'mix': mix,
+            'burst': options['burst'],
+            'pause': options['pause_ms'] / 1000,
+            'post_id': options['post'] or self._target_post(),
+        }
+
+        self.stdout.write(f'{"mode":<9} {"writes/s":>9} {"commits/s":>10} {"err%":>6} {"locked":>7} '
+                          f'{"p50 ms":>8} {"p99 ms":>8} {"lock avg":>9} {"lock p99":>9} {"batch":>6}')
+        if not options['serve']:
+            url = options['url'] if options['url'].endswith('/') else options['url'] + '/'
+            self._report('server', self._run(url, clients, plan, options))
+            return
+
+        for mode in options['modes'].split(','):
+            if mode not in MODES:
+                raise CommandError(f'Unknown mode {mode!r}; choose from {", ".join(MODES)}.')
+            with self._server(options['server_cmd'], options['port'], MODES[mode]):
+                url = f'http://127.0.0.1:{options["port"]}/api/'
+                self._report(mode, self._run(url, clients, plan, options))
+
+    @staticmethod
+    def _parse_mix(spec):
+        mix = []
+        for part in spec.split(','):
+            kind, _, weight = part.partition('=')
+            if kind not in KINDS:
+                raise CommandError(f'Unknown kind {kind!r} in --mix; choose from {", ".join(KINDS)}.')
+            try:
+                mix.append((kind, float(weight or 1)))
+            except ValueError:
+                raise CommandError(f'Bad weight in --mix: {part!r}')
+        return mix
+
+    @staticmethod
+    def _clients(n_users, n_clients):
+        from django.contrib.auth import get_user_model
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        User = get_user_model()
+        users = []
+        for i in range(max(n_users, 2)):
+            user, created = User.objects.get_or_create(username=f'writeload{i}',
+                                                       defaults={'email': f'writeload{i}@example.com'})
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            users.append(user)
+        tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+        # Client i writes as user i (mod users) and messages the next user.
+        return [(tokens[i % len(users)], users[(i + 1) % len(users)].pk) for i in range(n_clients)]
+
+    @staticmethod
+    def _target_post():
+        from django.contrib.auth import get_user_model
+        from social.models import Post
+
+        author = get_user_model().objects.get(username='writeload0')
+        post = Post.objects.filter(author=author).order_by('-id').first()
+        if post is None:
+            post = Post.objects.create(author=author, content='Comment storm target')
+        return post.pk
+
+    @contextmanager
+    def _server(self, command, port, batching):
+        env = {**os.environ, 'WRITE_BATCHING': batching}
+        argv = shlex.split(command.format(python=sys.executable, port=port))
+        process = subprocess.Popen(argv, cwd=settings.BASE_DIR, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f'Server exited early: {command}')
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'Server did not start listening on port {port}.')
+                    time.sleep(0.2)
+            yield
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    @staticmethod
+    def _run(url, clients, plan, options):
+        per_process = options['clients']
+        groups = [clients[i:i + per_process] for i in range(0, len(clients), per_process)]
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(_worker, url, group, plan, options['duration']) for group in groups]
+            parts = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+        merged = {'latencies': [], 'lock_ms': [], 'queue_ms': [], 'commits': 0.0,
+                  'ok': 0, 'locked': 0, 'failed': 0}
+        for part in parts:
+            for key, value in part.items():
+                merged[key] += value
+        merged['elapsed'] = elapsed
+        return merged
+
+    def _report(self, mode, result):
+        latencies = sorted(result['latencies'])
+        lock_ms = sorted(result['lock_ms'])
+        total = result['ok'] + result['locked'] + result['failed']
+        errors = result['locked'] + result['failed']
+        elapsed = result['elapsed']
+        self.stdout.write(
+            f'{mode:<9} {result["ok"] / elapsed:9.1f} {result["commits"] / elapsed:10.1f} '
+            f'{errors / total * 100 if total else 0.0:6.2f} {result["locked"]:7d} '
+            f'{_percentile(latencies, 0.5):8.1f} {_percentile(latencies, 0.99):8.1f} '
+            f'{sum(lock_ms) / len(lock_ms) if lock_ms else 0.0:9.1f} {_percentile(lock_ms, 0.99):9.1f} '
+            f'{result["ok"] / result["commits"] if result["commits"] else 0.0:6.1f}'
+        )
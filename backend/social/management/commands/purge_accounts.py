@@ -0,0 +1,60 @@
+"""
+Management command: purge_accounts
+-----------------------------------
+Usage:
+    python manage.py purge_accounts                 # work through queued jobs
+    python manage.py purge_accounts --user alice    # queue (and run) one account
+    python manage.py purge_accounts --batch-size 200
+
+Runs the chunked account purge from ``social.purge``. Jobs are queued by
+``DELETE /api/users/{id}/`` (which only deactivates the account) and are
+resumable: a job that failed or was interrupted continues from its last stage.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from social.models import PurgeJob
+from social.purge import DEFAULT_BATCH_SIZE, enqueue_purge, run_purge
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Delete queued accounts and their content in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username or id to queue for purge before running.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--retry-failed', action='store_true', help='Also resume failed jobs.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            self._enqueue(options['user'])
+
+        statuses = [PurgeJob.QUEUED, PurgeJob.RUNNING]
+        if options['retry_failed']:
+            statuses.append(PurgeJob.FAILED)
+        jobs = list(PurgeJob.objects.filter(status__in=statuses))
+        if not jobs:
+            self.stdout.write('Nothing to purge.')
+            return
+
+        for job in jobs:
+            resumed = f' (resuming at {job.stage})' if job.stage else ''
+            self.stdout.write(f'🗑  Purging @{job.username} [job {job.id}]{resumed}')
+            run_purge(job, batch_size=options['batch_size'], report=self._report)
+            total = sum(job.progress.values())
+            self.stdout.write(self.style.SUCCESS(f'   ✅ Done — {total} rows removed.'))
+
+    def _report(self, stage, deleted):
+        self.stdout.write(f'   {stage:<24} {deleted:>8}')
+
+    def _enqueue(self, ident):
+        lookup = {'pk': int(ident)} if ident.isdigit() else {'username': ident}
+        try:
+            user = User.objects.get(**lookup)
+        except User.DoesNotExist:
+            raise CommandError(f'No user matching {ident!r}.')
+        job = enqueue_purge(user)
+        self.stdout.write(f'Queued @{user.username} as job {job.id}.')
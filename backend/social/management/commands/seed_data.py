@@ -33,6 +33,7 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 
 from social.models import Post, Like, Comment, Message
+from social.purge import clear_all_content
 
 User = get_user_model()
 
@@ -190,11 +191,9 @@ class Command(BaseCommand):
         # ── Optional wipe ──────────────────────────────────────────────────
         if options['clear']:
             self.stdout.write(self.style.WARNING('⚠  Clearing existing data…'))
-            Message.objects.all().delete()
-            Comment.objects.all().delete()
-            Like.objects.all().delete()
-            Post.objects.all().delete()
-            User.objects.exclude(is_superuser=True).delete()
+            cleared = clear_all_content()
+            for table, count in cleared.items():
+                self.stdout.write(f'   🗑  {count:>6} {table}')
             self.stdout.write(self.style.WARNING('   Done.\n'))
 
         # ── 1. Users ───────────────────────────────────────────────────────
@@ -0,0 +1,89 @@
+"""
+Management command: sql_report
+-------------------------------
+Usage:
+    python manage.py sql_report                     # top 20 fingerprints by total time
+    python manage.py sql_report --top 10 --sort mean
+    python manage.py sql_report --slow 5            # last 5 slow-query log entries with plans
+    python manage.py sql_report --reset
+
+Merges the per-worker snapshots written by the SQL profiler
+(``social.profiling``, enabled with ``SQL_PROFILER['ENABLED']``) and lists the
+heaviest query fingerprints with their call sites and routes.
+"""
+
+import json
+from collections import deque
+
+from django.core.management.base import BaseCommand
+
+from social.profiling import clear_snapshots, load_snapshots, merge_snapshots, slow_log_path
+
+SORT_KEYS = {
+    'total': lambda e: e['total_ms'],
+    'mean': lambda e: e['total_ms'] / e['count'],
+    'count': lambda e: e['count'],
+    'max': lambda e: e['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = "Top-N SQL fingerprints and recent slow queries from the SQL profiler."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total')
+        parser.add_argument('--sites', type=int, default=3, help='Call sites / routes shown per fingerprint.')
+        parser.add_argument('--slow', type=int, default=0, metavar='N', help='Also show the last N slow queries.')
+        parser.add_argument('--reset', action='store_true', help='Delete the collected snapshots.')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            clear_snapshots()
+            self.stdout.write(self.style.SUCCESS('SQL profile snapshots removed.'))
+            return
+
+        snapshots = load_snapshots()
+        merged = merge_snapshots(snapshots)
+        if not merged:
+            self.stdout.write('No profile data yet (is SQL_PROFILER["ENABLED"] set, and has a worker flushed?).')
+        else:
+            self._top(merged, options)
+        dropped = sum(snapshot.get('dropped', 0) for snapshot in snapshots)
+        if dropped:
+            self.stdout.write(self.style.WARNING(f'{dropped} queries not recorded (MAX_FINGERPRINTS reached).'))
+        if options['slow']:
+            self._slow(options['slow'])
+
+    def _top(self, merged, options):
+        total_ms = sum(entry['total_ms'] for entry in merged.values()) or 1.0
+        ranked = sorted(merged.items(), key=lambda item: SORT_KEYS[options['sort']](item[1]), reverse=True)
+        self.stdout.write(f'{len(merged)} fingerprints, {sum(e["count"] for e in merged.values())} queries, '
+                          f'{total_ms:.0f} ms in total\n')
+        for key, entry in ranked[:options['top']]:
+            mean = entry['total_ms'] / entry['count']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{key}  total {entry["total_ms"]:.1f} ms ({entry["total_ms"] / total_ms:.0%})  '
+                f'calls {entry["count"]}  mean {mean:.2f} ms  max {entry["max_ms"]:.1f} ms'
+            ))
+            self.stdout.write(f'    {entry["sql"][:300]}')
+            for label in ('sites', 'routes'):
+                for name, count in sorted(entry[label].items(), key=lambda item: -item[1])[:options['sites']]:
+                    self.stdout.write(f'    {label[:-1]:<5} {count:>7}  {name}')
+
+    def _slow(self, n):
+        path = slow_log_path()
+        if not path.exists():
+            self.stdout.write(f'\nNo slow-query log at {path}.')
+            return
+        with open(path, encoding='utf-8') as log:
+            entries = deque(log, maxlen=n)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nLast {len(entries)} slow queries ({path})'))
+        for line in entries:
+            entry = json.loads(line)
+            self.stdout.write(f'{entry["ts"]}  {entry["duration_ms"]} ms  {entry["route"]}  {entry["site"]}')
+            self.stdout.write(f'    {entry["sql"][:300]}')
+            for step in entry.get('plan') or []:
+                self.stdout.write(f'    | {step}')
+            if 'plan_error' in entry:
+                self.stdout.write(f'    | EXPLAIN failed: {entry["plan_error"]}')
@@ -0,0 +1,173 @@
+"""
+Media serving with validators, long-lived caching and byte ranges.
+
+Replaces ``django.views.static.serve`` for ``MEDIA_URL``:
+
+* full responses go out as ``FileResponse`` so WSGI servers with
+  ``wsgi.file_wrapper`` (gunicorn, uWSGI) use ``sendfile()``; setting
+  ``MEDIA_SENDFILE_HEADER`` (``'X-Accel-Redirect'`` or ``'X-Sendfile'``) hands
+  the transfer to the front-end proxy instead;
+* content-addressed files (``social.storage``) get their hash as a strong
+  ``ETag`` and ``Cache-Control: immutable``; legacy names use size+mtime;
+* ``If-None-Match`` / ``If-Modified-Since`` answer ``304``, and single
+  ``Range: bytes=…`` requests (honouring ``If-Range``) answer ``206``.
+"""
+
+import mimetypes
+import os
+import posixpath
+from pathlib import Path
+from stat import S_ISREG
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MUTABLE_CACHE_CONTROL = 'public, max-age=3600'
+
+
+class _RangeFile:
+    """Read-only view of ``length`` bytes of ``fileobj`` starting at ``start``."""
+
+    def __init__(self, fileobj, start, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        fileobj.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def _etag_for(name, stat, immutable):
+    if immutable:
+        return '"%s"' % os.path.splitext(posixpath.basename(name))[0]
+    return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in header.split(',')]
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single satisfiable byte range,
+    ``None`` when the header should be ignored, or ``False`` if unsatisfiable.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec:
+        return None                 # multipart ranges: serve the whole file
+    first, sep, last = spec.partition('-')
+    if not sep:
+        return None
+    try:
+        if first == '':
+            suffix = int(last)
+            if suffix <= 0:
+                return False
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+    except Exception:
+        raise Http404('Invalid media path.')
+    try:
+        stat = full_path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Media file not found.')
+    if not S_ISREG(stat.st_mode):
+        raise Http404('Media file not found.')
+
+    name = posixpath.normpath(path).lstrip('/')
+    immutable = is_content_addressed(name)
+    etag = _etag_for(name, stat, immutable)
+    last_modified = http_date(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': last_modified,
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL,
+        'Accept-Ranges': 'bytes',
+    }
+
+    if_none_match = request.headers.get('If-None-Match')
+    if _etag_matches(if_none_match, etag):
+        return _with_headers(HttpResponseNotModified(), headers)
+    if if_none_match is None:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if since is not None and int(stat.st_mtime) <= since:
+            return _with_headers(HttpResponseNotModified(), headers)
+
+    content_type, encoding = mimetypes.guess_type(str(full_path))
+    content_type = content_type or 'application/octet-stream'
+
+    byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range and if_range not in (etag, last_modified):
+        byte_range = None           # representation changed: send it all
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return _with_headers(response, headers)
+
+    sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if sendfile_header:
+        # Let the proxy stream the file; it applies the Range header itself.
+        # mod_xsendfile wants a filesystem path, X-Accel-Redirect an internal URI.
+        if sendfile_header.lower() == 'x-sendfile':
+            target = str(full_path)
+        else:
+            target = getattr(settings, 'MEDIA_SENDFILE_PREFIX', settings.MEDIA_URL) + name
+        response = HttpResponse(content_type=content_type)
+        response[sendfile_header] = target
+        return _with_headers(response, headers)
+
+    fileobj = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(fileobj, content_type=content_type)
+        response['Content-Length'] = str(stat.st_size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(_RangeFile(fileobj, start, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _with_headers(response, headers)
+
+
+def _with_headers(response, headers):
+    for key, value in headers.items():
+        response[key] = value
+    return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notifications_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('like', 'Like'), ('comment', 'Comment'), ('message', 'Message')], max_length=16)),
+                ('key', models.CharField(max_length=64)),
+                ('recent_actor_ids', models.JSONField(blank=True, default=list)),
+                ('actor_count', models.PositiveIntegerField(default=0)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='social.post')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated_at', '-id'],
+                'indexes': [models.Index(fields=['recipient', 'is_read', '-updated_at'], name='notif_recipient_unread_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipient', 'key'), name='unique_notification_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Affinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('viewer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='affinities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('viewer', 'author')},
+            },
+        ),
+    ]
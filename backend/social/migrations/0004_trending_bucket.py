@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0003_affinity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_seconds', models.PositiveIntegerField()),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_buckets', to='social.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_seconds', 'bucket_start'], name='trending_bucket_start_idx')],
+                'unique_together': {('post', 'bucket_seconds', 'bucket_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    User = apps.get_model('social', 'User')
+    Post = apps.get_model('social', 'Post')
+    Like = apps.get_model('social', 'Like')
+    Friendship = User.friends.through
+
+    def count_of(queryset, group_by):
+        return Coalesce(Subquery(
+            queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n')
+        ), 0)
+
+    User.objects.update(
+        posts_count=count_of(Post.objects.filter(author=OuterRef('pk')), 'author'),
+        likes_received_count=count_of(Like.objects.filter(post__author=OuterRef('pk')), 'post__author'),
+        friends_count=count_of(Friendship.objects.filter(from_user=OuterRef('pk')), 'from_user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_trending_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='friends_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='likes_received_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at'], name='post_author_created_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0006_purge_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'receiver', '-id'], name='message_thread_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='receiver',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='sender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(fields=['sender', 'receiver', '-id'], name='archived_message_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0008_group_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0009_post_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'author'], name='comment_post_author_idx'),
+        ),
+    ]
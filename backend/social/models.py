@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 
@@ -7,6 +8,11 @@ class User(AbstractUser):
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
     friends = models.ManyToManyField('self', blank=True, symmetrical=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    unread_notifications_count = models.PositiveIntegerField(default=0)
+    # Denormalized counters, maintained by social/signals.py.
+    posts_count = models.PositiveIntegerField(default=0)
+    friends_count = models.PositiveIntegerField(default=0)
+    likes_received_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.username
@@ -18,9 +24,14 @@ class Post(models.Model):
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every edit; clients send it back in If-Match (optimistic concurrency).
+    version = models.PositiveIntegerField(default=1)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['author', '-created_at'], name='post_author_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username}: {self.content[:50]}"
@@ -54,6 +65,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # "Has this user commented here before?" when folding a comment notification.
+            models.Index(fields=['post', 'author'], name='comment_post_author_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.username} on post {self.post.id}: {self.content[:30]}"
@@ -68,6 +83,187 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['sender', 'receiver', '-id'], name='message_thread_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.sender.username} -> {self.receiver.username}: {self.content[:30]}"
\ No newline at end of file
+        return f"{self.sender.username} -> {self.receiver.username}: {self.content[:30]}"
+
+
+class ArchivedMessage(models.Model):
+    """Cold copy of a `Message` moved out by `archive_messages`; keeps the original id."""
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    content = models.TextField()
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['sender', 'receiver', '-id'], name='archived_message_thread_idx'),
+        ]
+
+    def __str__(self):
+        return f"[archived] {self.sender_id} -> {self.receiver_id}: {self.content[:30]}"
+
+
+class Thread(models.Model):
+    """Group conversation; members and their read cursors live on `ThreadMember`."""
+    title = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    members = models.ManyToManyField(User, through='ThreadMember', related_name='threads')
+    member_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_message_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.title or f"Thread #{self.pk}"
+
+
+class ThreadMember(models.Model):
+    """
+    Membership plus read cursor: every message in the thread with an id up to
+    ``last_read_id`` counts as read.  ``last_message_at`` mirrors the thread's
+    so the inbox is one range scan of ``thread_member_inbox_idx``.
+    """
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='thread_memberships')
+    last_read_id = models.PositiveBigIntegerField(default=0)
+    last_message_at = models.DateTimeField(default=timezone.now)
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'user'], name='unique_thread_member'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at', '-id'], name='thread_member_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} in {self.thread}"
+
+
+class ThreadMessage(models.Model):
+    thread = models.ForeignKey(Thread, on_delete=models.CASCADE, related_name='messages')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_thread_messages')
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['thread', '-id'], name='thread_message_page_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sender.username} in {self.thread}: {self.content[:30]}"
+
+
+class Notification(models.Model):
+    """
+    One coalesced row per (recipient, aggregation key).  Repeated events on the
+    same target update the existing row instead of inserting new ones, so a post
+    receiving 10k likes still owns a single "like" notification for its author.
+    """
+    LIKE = 'like'
+    COMMENT = 'comment'
+    MESSAGE = 'message'
+    VERB_CHOICES = [
+        (LIKE, 'Like'),
+        (COMMENT, 'Comment'),
+        (MESSAGE, 'Message'),
+    ]
+
+    # How many distinct recent actors are kept for display / retraction.
+    RECENT_ACTORS = 10
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    verb = models.CharField(max_length=16, choices=VERB_CHOICES)
+    key = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    last_actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    recent_actor_ids = models.JSONField(default=list, blank=True)
+    actor_count = models.PositiveIntegerField(default=0)
+    event_count = models.PositiveIntegerField(default=0)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-updated_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['recipient', 'key'], name='unique_notification_key'),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-updated_at'], name='notif_recipient_unread_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.verb} -> {self.recipient.username} ({self.actor_count} actors)"
+
+
+class Affinity(models.Model):
+    """Precomputed viewer → author interaction score, refreshed by `refresh_affinity`."""
+    viewer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='affinities')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('viewer', 'author')
+
+    def __str__(self):
+        return f"{self.viewer.username} -> {self.author.username}: {self.score:.3f}"
+
+
+class TrendingBucket(models.Model):
+    """Persisted slice of the in-memory trending counters (see `social.trending`)."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='trending_buckets')
+    bucket_seconds = models.PositiveIntegerField()
+    bucket_start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'bucket_seconds', 'bucket_start')
+        indexes = [
+            models.Index(fields=['bucket_seconds', 'bucket_start'], name='trending_bucket_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"post {self.post_id} @ {self.bucket_start:%Y-%m-%d %H:%M} ({self.bucket_seconds}s): {self.count}"
+
+
+class PurgeJob(models.Model):
+    """Resumable account deletion, executed in bounded batches by `purge_accounts`."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    # Plain id rather than a FK: the job outlives the user row it deletes.
+    user_id = models.BigIntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=32, blank=True)
+    progress = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"purge @{self.username} ({self.status})"
@@ -0,0 +1,154 @@
+"""
+Write-time notification aggregation.
+
+Every like / comment / message funnels through ``notify`` which folds the event
+into a single ``Notification`` row keyed by (recipient, target).  The row keeps
+a bounded list of recent actors plus counts, so the number of rows per target
+stays constant no matter how many events arrive.  ``notify`` bumps
+``actor_count`` only when the event brings a new distinct actor (any new like;
+a comment from someone who hadn't commented on the post yet), so each event
+costs constant work.  Removals (``retract``, purges) recount from the post's
+likes / comments instead, so toggling can never drift it.  The recipient's
+``unread_notifications_count`` is adjusted only when a row flips between read
+and unread, which keeps the unread badge a single column read.
+"""
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Comment, Like, Notification, User
+
+
+def notification_key(verb, post=None, actor=None):
+    """Aggregation key: posts coalesce per post, messages per sender."""
+    if verb == Notification.MESSAGE:
+        return f'message:user:{actor.pk}'
+    return f'{verb}:post:{post.pk}'
+
+
+def _source_actors(verb, recipient_id, post_id, exclude=()):
+    """Distinct actors behind a like/comment notification, newest first (a queryset of ids)."""
+    excluded = [recipient_id, *exclude]
+    if verb == Notification.LIKE:
+        return (Like.objects.filter(post_id=post_id).exclude(user_id__in=excluded)
+                .order_by('-id').values_list('user_id', flat=True))
+    return (Comment.objects.filter(post_id=post_id).exclude(author_id__in=excluded)
+            .values('author_id').annotate(latest=Max('id')).order_by('-latest')
+            .values_list('author_id', flat=True))
+
+
+def actor_count(verb, recipient_id, post_id, exclude=()):
+    """How many distinct users the notification currently stands for."""
+    if verb == Notification.MESSAGE:
+        return 1
+    return _source_actors(verb, recipient_id, post_id, exclude).count()
+
+
+def _is_new_actor(verb, actor_id, post_id):
+    """Whether the like/comment just saved is ``actor_id``'s only one on the post."""
+    if verb == Notification.LIKE:
+        return True             # likes are unique per (user, post)
+    return Comment.objects.filter(post_id=post_id, author_id=actor_id)[:2].count() == 1
+
+
+def notify(recipient, actor, verb, post=None):
+    """
+    Fold one event into the recipient's coalesced notification row.  Call
+    after saving the event's new ``Like`` / ``Comment`` row.
+    """
+    if recipient.pk == actor.pk:
+        return None
+
+    key = notification_key(verb, post=post, actor=actor)
+    with transaction.atomic():
+        notification, created = Notification.objects.select_for_update().get_or_create(
+            recipient=recipient, key=key,
+            defaults={'verb': verb, 'post': post},
+        )
+        became_unread = created or notification.is_read
+
+        recent = [pk for pk in notification.recent_actor_ids if pk != actor.pk]
+        if created or verb == Notification.MESSAGE:
+            # A (re)created row may stand for engagement from before it existed.
+            notification.actor_count = actor_count(verb, recipient.pk, post.pk if post else None)
+        elif _is_new_actor(verb, actor.pk, post.pk):
+            notification.actor_count += 1
+        notification.recent_actor_ids = [actor.pk] + recent[:Notification.RECENT_ACTORS - 1]
+        notification.last_actor = actor
+        notification.event_count = 1 if became_unread else notification.event_count + 1
+        notification.is_read = False
+        notification.updated_at = timezone.now()
+        notification.save()
+
+        if became_unread:
+            User.objects.filter(pk=recipient.pk).update(
+                unread_notifications_count=F('unread_notifications_count') + 1
+            )
+    return notification
+
+
+def retract(recipient, actor, verb, post=None):
+    """
+    Undo a post event (e.g. unlike) after its source row is gone; drops the
+    notification once no actors remain.
+    """
+    if recipient.pk == actor.pk:
+        return
+
+    key = notification_key(verb, post=post, actor=actor)
+    with transaction.atomic():
+        notification = (
+            Notification.objects.select_for_update()
+            .filter(recipient=recipient, key=key)
+            .first()
+        )
+        if notification is not None:
+            refresh_actors(notification, actor.pk)
+
+
+def refresh_actors(notification, departed_id, exclude=()):
+    """
+    Recount a like/comment ``notification`` from its source rows after
+    ``departed_id`` stopped being an actor, skipping users in ``exclude`` (e.g.
+    an account being purged).  Deletes the row once no actors remain.  Call
+    inside a transaction holding the row.
+    """
+    verb, recipient_id, post_id = notification.verb, notification.recipient_id, notification.post_id
+    notification.actor_count = actor_count(verb, recipient_id, post_id, exclude)
+    if notification.actor_count == 0:
+        if not notification.is_read:
+            _decrement_unread(recipient_id, 1)
+        notification.delete()
+        return
+
+    if departed_id in notification.recent_actor_ids:
+        notification.event_count = max(notification.event_count - 1, 0)
+    # Rebuilt from the source rows, so older actors move up as recent ones leave
+    # and ids of deleted accounts can never linger in the list.
+    notification.recent_actor_ids = list(
+        _source_actors(verb, recipient_id, post_id, exclude)[:Notification.RECENT_ACTORS]
+    )
+    notification.last_actor_id = notification.recent_actor_ids[0]
+    notification.save(update_fields=[
+        'recent_actor_ids', 'actor_count', 'event_count', 'last_actor',
+    ])
+
+
+def mark_read(recipient, ids=None):
+    """Bulk mark-read; ``ids=None`` marks everything. Returns rows updated."""
+    with transaction.atomic():
+        qs = Notification.objects.filter(recipient=recipient, is_read=False)
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        updated = qs.update(is_read=True)
+        if updated:
+            _decrement_unread(recipient.pk, updated)
+    return updated
+
+
+def _decrement_unread(user_id, amount):
+    User.objects.filter(pk=user_id).update(
+        unread_notifications_count=Greatest(F('unread_notifications_count') - amount, 0)
+    )
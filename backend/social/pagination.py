@@ -0,0 +1,40 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class PostCursorPagination(CursorPagination):
+    page_size = 10
+    max_page_size = 50
+    page_size_query_param = 'page_size'
+    ordering = '-created_at'
+
+
+class ThreadCursorPagination(CursorPagination):
+    """Inbox order; served straight off ``thread_member_inbox_idx``."""
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-last_message_at', '-id')
+
+
+class ThreadMessageCursorPagination(CursorPagination):
+    """Newest first; ``next`` scrolls back through the history."""
+    page_size = 30
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = '-id'
+
+
+class NotificationCursorPagination(CursorPagination):
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-updated_at', '-id')
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'unread_count': self.request.user.unread_notifications_count,
+            'results': data,
+        })
@@ -0,0 +1,333 @@
+"""
+Opt-in SQL profiler.
+
+Enable with ``SQL_PROFILER['ENABLED'] = True``; otherwise the middleware
+removes itself at startup (``MiddlewareNotUsed``) and costs nothing.
+
+While a request runs, ``connection.execute_wrapper`` times every statement and
+records it under a *fingerprint* — the SQL with placeholders, literals and
+``IN (...)`` lists normalised — together with the project call site that issued
+it (e.g. ``social/views.py:187 feed``) and the request's route.
+
+* Fingerprints are aggregated in process memory (count, total/max time, call
+  sites, routes) and written to ``STATS_DIR/sql-<pid>.json`` every
+  ``FLUSH_INTERVAL`` seconds, so ``python manage.py sql_report`` can merge the
+  totals of every worker.
+* Statements slower than ``SLOW_MS`` are appended as JSON lines to the rotating
+  ``SLOW_LOG``, with the database's ``EXPLAIN`` plan attached (SELECTs only,
+  one plan per fingerprint per ``EXPLAIN_TTL`` seconds).
+* Responses carry a ``Server-Timing: sql;dur=…;desc="N queries"`` header.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SLOW_MS': 100,
+    'EXPLAIN': True,
+    'EXPLAIN_TTL': 300,
+    'SLOW_LOG': None,
+    'SLOW_LOG_MAX_BYTES': 5 * 1024 * 1024,
+    'SLOW_LOG_BACKUPS': 3,
+    'STATS_DIR': None,
+    'FLUSH_INTERVAL': 30,
+    'MAX_FINGERPRINTS': 2000,
+}
+
+PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve()) + os.sep
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'SQL_PROFILER', {})}
+
+
+# ─── Fingerprints ────────────────────────────────────────────────────────────
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?|%\(\w+\)s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES\s*\(.*\)', re.IGNORECASE | re.DOTALL)
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """SQL with every value replaced by ``?`` so equivalent statements compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:12]
+
+
+def call_site():
+    """``path:line function`` of the innermost project frame outside this module, or ``None``."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_ROOT) and filename != __file__
+                and 'site-packages' not in filename):
+            relative = filename[len(PROJECT_ROOT):].replace(os.sep, '/')
+            return f'{relative}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+# ─── In-memory aggregation ───────────────────────────────────────────────────
+
+class QueryStats:
+    """Per-process fingerprint totals; thread-safe, bounded by ``max_fingerprints``."""
+
+    def __init__(self, max_fingerprints=2000):
+        self.max_fingerprints = max_fingerprints
+        self.entries = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, key, sql, duration_ms, site, route):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                if len(self.entries) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                entry = self.entries[key] = {
+                    'sql': sql, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'sites': {}, 'routes': {},
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['sites'][site] = entry['sites'].get(site, 0) + 1
+            if route:
+                entry['routes'][route] = entry['routes'].get(route, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'dropped': self.dropped,
+                'fingerprints': {
+                    key: {**entry, 'sites': dict(entry['sites']), 'routes': dict(entry['routes'])}
+                    for key, entry in self.entries.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self.entries.clear()
+            self.dropped = 0
+
+
+def merge_snapshots(snapshots):
+    """Combine ``snapshot()`` dicts from several processes into one fingerprint map."""
+    merged = {}
+    for snapshot in snapshots:
+        for key, entry in snapshot['fingerprints'].items():
+            into = merged.setdefault(key, {'sql': entry['sql'], 'count': 0, 'total_ms': 0.0,
+                                           'max_ms': 0.0, 'sites': {}, 'routes': {}})
+            into['count'] += entry['count']
+            into['total_ms'] += entry['total_ms']
+            into['max_ms'] = max(into['max_ms'], entry['max_ms'])
+            for field in ('sites', 'routes'):
+                for name, count in entry[field].items():
+                    into[field][name] = into[field].get(name, 0) + count
+    return merged
+
+
+def stats_dir():
+    directory = config()['STATS_DIR']
+    return Path(directory) if directory else Path(settings.BASE_DIR) / 'logs' / 'sqlprofile'
+
+
+def load_snapshots():
+    snapshots = []
+    for path in sorted(stats_dir().glob('sql-*.json')):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def clear_snapshots():
+    for path in stats_dir().glob('sql-*.json'):
+        path.unlink(missing_ok=True)
+
+
+# ─── Slow-query log ──────────────────────────────────────────────────────────
+
+def slow_log_path():
+    path = config()['SLOW_LOG']
+    return Path(path) if path else Path(settings.BASE_DIR) / 'logs' / 'slow_queries.log'
+
+
+def _slow_logger():
+    logger = logging.getLogger('social.slow_queries')
+    if not logger.handlers:
+        conf = config()
+        path = slow_log_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=conf['SLOW_LOG_MAX_BYTES'],
+                                      backupCount=conf['SLOW_LOG_BACKUPS'], encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+
+def explain(connection, sql, params):
+    """The plan for ``sql`` as a list of lines, or ``None`` for non-SELECT statements."""
+    if not _EXPLAINABLE.match(sql):
+        return None
+    prefix = connection.ops.explain_query_prefix()
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        rows = cursor.fetchall()
+    if connection.vendor == 'sqlite':
+        return [str(row[-1]) for row in rows]     # (id, parent, notused, detail)
+    return [' '.join(str(col) for col in row) for row in rows]
+
+
+# ─── Profiler ────────────────────────────────────────────────────────────────
+
+class SQLProfiler:
+    def __init__(self, conf):
+        self.conf = conf
+        self.stats = QueryStats(conf['MAX_FINGERPRINTS'])
+        self._explained = {}
+        self._local = threading.local()
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+
+    def wrapper(self, connection, request, totals):
+        def execute(execute_, sql, params, many, context):
+            if getattr(self._local, 'explaining', False):
+                return execute_(sql, params, many, context)
+            started = time.perf_counter()
+            try:
+                return execute_(sql, params, many, context)
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                totals[0] += 1
+                totals[1] += duration_ms
+                self._record(connection, sql, params, many, duration_ms, request)
+        return execute
+
+    def _record(self, connection, sql, params, many, duration_ms, request):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        route, view = _route(request)
+        # Queries issued entirely inside DRF/Django (e.g. a stock retrieve) have no project frame.
+        site = call_site() or f'<{view}>'
+        self.stats.record(key, normalized, duration_ms, site, route)
+        if duration_ms >= self.conf['SLOW_MS']:
+            self._log_slow(connection, key, sql, params, many, duration_ms, site, route)
+
+    def _log_slow(self, connection, key, sql, params, many, duration_ms, site, route):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'duration_ms': round(duration_ms, 2),
+            'fingerprint': key,
+            'sql': sql,
+            'params': None if many else [repr(p)[:200] for p in (params or ())],
+            'site': site,
+            'route': route,
+            'vendor': connection.vendor,
+        }
+        now = time.monotonic()
+        if self.conf['EXPLAIN'] and not many and now - self._explained.get(key, -1e9) >= self.conf['EXPLAIN_TTL']:
+            self._explained[key] = now
+            self._local.explaining = True
+            try:
+                entry['plan'] = explain(connection, sql, params)
+            except Exception as exc:   # e.g. aborted transaction; never break the request
+                entry['plan_error'] = repr(exc)
+            finally:
+                self._local.explaining = False
+        _slow_logger().info(json.dumps(entry, default=str))
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush < self.conf['FLUSH_INTERVAL']:
+            return
+        self.flush()
+
+    def flush(self):
+        """Write this process's snapshot for ``sql_report``."""
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            directory = stats_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f'sql-{os.getpid()}.json'
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self.stats.snapshot()))
+            os.replace(tmp, path)
+
+
+def _route(request):
+    """
+    ``(route, view)``; the route is the URL name once resolved, so /api/posts/1/
+    and /api/posts/2/ aggregate together.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f'{request.method} {request.path}', 'unresolved'
+    view = getattr(match.func, 'cls', match.func)
+    name = match.view_name or match.route
+    return f'{request.method} {name}', f'{view.__module__}.{view.__qualname__}'
+
+
+_profiler = None
+
+
+def get_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = SQLProfiler(config())
+    return _profiler
+
+
+class SQLProfilerMiddleware:
+    """Profiles every query issued while the request is handled (all DB aliases)."""
+
+    def __init__(self, get_response):
+        if not config()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profiler = get_profiler()
+
+    def __call__(self, request):
+        totals = [0, 0.0]       # queries, milliseconds
+        with ExitStack() as stack:
+            for alias in connections:
+                connection = connections[alias]
+                stack.enter_context(connection.execute_wrapper(self.profiler.wrapper(connection, request, totals)))
+            response = self.get_response(request)
+        timing = f'sql;dur={totals[1]:.1f};desc="{totals[0]} queries"'
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        self.profiler.maybe_flush()
+        return response
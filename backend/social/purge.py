@@ -0,0 +1,289 @@
+"""
+Chunked, resumable account purge.
+
+Deleting a ``User`` through the ORM makes Django's collector load every related
+row (posts, likes, comments, messages, …) into memory and delete them in one
+long transaction.  ``run_purge`` instead walks a fixed list of stages; each
+stage repeatedly selects up to ``batch_size`` primary keys and removes them
+with a raw ``DELETE … WHERE id IN (…)`` in its own short transaction, fixing
+up the denormalized counters of *other* users in bulk as it goes.
+
+Every stage is idempotent, so a job that crashed or was killed simply resumes
+from the stage recorded on its ``PurgeJob`` row.  Media files left without a
+referencing row are removed once the batch that orphaned them has committed.
+Notifications the user acted on are recounted without them, so no other user
+keeps a "Alice and 3 others" row pointing at a deleted account.
+"""
+
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import (
+    Affinity, ArchivedMessage, Comment, Like, Message, Notification, Post, PurgeJob,
+    Thread, ThreadMember, ThreadMessage, TrendingBucket, User,
+)
+from .notifications import refresh_actors
+from .signals import refresh_friends_count
+
+DEFAULT_BATCH_SIZE = 500
+
+
+# ─── Low-level helpers ───────────────────────────────────────────────────────
+
+def raw_delete(model, ids):
+    """``DELETE FROM <table> WHERE pk IN (ids)`` without the ORM collector."""
+    if not ids:
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({placeholders})', list(ids))
+        return cursor.rowcount
+
+
+def drain(queryset, batch_size=DEFAULT_BATCH_SIZE, before_delete=None, on_batch=None):
+    """Delete everything matching ``queryset`` in batches; returns rows deleted."""
+    model = queryset.model
+    pks = queryset.order_by().values_list('pk', flat=True)
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(pks[:batch_size])
+            if not ids:
+                break
+            if before_delete is not None:
+                before_delete(ids)
+            deleted = raw_delete(model, ids)
+        total += deleted
+        if on_batch is not None:
+            on_batch(deleted)
+    return total
+
+
+def decrement_counters(field, amounts):
+    """Subtract ``amounts[user_id]`` from ``field``; one UPDATE per distinct amount."""
+    by_amount = defaultdict(list)
+    for user_id, amount in amounts.items():
+        if amount:
+            by_amount[amount].append(user_id)
+    for amount, user_ids in by_amount.items():
+        User.objects.filter(pk__in=user_ids).update(**{field: Greatest(F(field) - amount, 0)})
+
+
+def remove_orphaned_media(names):
+    """Delete stored files no longer referenced by any post image or avatar."""
+    names = {name for name in names if name}
+    if not names:
+        return 0
+    referenced = set(Post.objects.filter(image__in=names).values_list('image', flat=True))
+    referenced |= set(User.objects.filter(avatar__in=names).values_list('avatar', flat=True))
+    storage = Post._meta.get_field('image').storage
+    removed = 0
+    for name in names - referenced:
+        if storage.exists(name):
+            storage.delete(name)
+            removed += 1
+    return removed
+
+
+def _remove_media_on_commit(names):
+    names = list(names)
+    if names:
+        transaction.on_commit(lambda: remove_orphaned_media(names))
+
+
+# ─── Batch hooks (counter fix-ups for surviving users) ───────────────────────
+
+def _scrub_actor(user_id, verb, rows):
+    """Recount other users' ``verb`` notifications on the posts of ``rows`` without ``user_id``."""
+    notifications = (
+        Notification.objects.select_for_update()
+        .filter(verb=verb, post_id__in=rows.values('post_id'))
+        .exclude(recipient_id=user_id)
+    )
+    for notification in list(notifications):
+        refresh_actors(notification, user_id, exclude=[user_id])
+
+
+def _likes_given_hook(user_id):
+    def hook(like_ids):
+        likes = Like.objects.filter(pk__in=like_ids)
+        received = dict(likes.values_list('post__author_id').annotate(n=Count('pk')).order_by())
+        decrement_counters('likes_received_count', received)
+        _scrub_actor(user_id, Notification.LIKE, likes)
+    return hook
+
+
+def _comments_given_hook(user_id):
+    def hook(comment_ids):
+        _scrub_actor(user_id, Notification.COMMENT, Comment.objects.filter(pk__in=comment_ids))
+    return hook
+
+
+def _unread_notifications_hook(notification_ids):
+    unread = dict(
+        Notification.objects.filter(pk__in=notification_ids, is_read=False)
+        .values_list('recipient_id').annotate(n=Count('pk')).order_by()
+    )
+    decrement_counters('unread_notifications_count', unread)
+
+
+def _friendships_hook(user_id):
+    through = User.friends.through
+
+    def hook(row_ids):
+        friends = list(through.objects.filter(pk__in=row_ids, from_user_id=user_id)
+                       .values_list('to_user_id', flat=True))
+        decrement_counters('friends_count', {friend: 1 for friend in friends})
+    return hook
+
+
+def _thread_memberships_hook(membership_ids):
+    thread_ids = ThreadMember.objects.filter(pk__in=membership_ids).values('thread_id')
+    Thread.objects.filter(pk__in=thread_ids).update(member_count=Greatest(F('member_count') - 1, 0))
+
+
+def _posts_hook(post_ids):
+    # The account is only deactivated, so likes / comments can still land on its
+    # posts after the post_* stages ran.  Clear them in this batch's transaction
+    # or the DELETE below fails on their foreign keys (and so would every resume).
+    for model in (Like, Comment, TrendingBucket):
+        raw_delete(model, list(model.objects.filter(post_id__in=post_ids).values_list('pk', flat=True)))
+    notification_ids = list(Notification.objects.filter(post_id__in=post_ids).values_list('pk', flat=True))
+    _unread_notifications_hook(notification_ids)
+    raw_delete(Notification, notification_ids)
+    _remove_media_on_commit(Post.objects.filter(pk__in=post_ids).values_list('image', flat=True))
+
+
+# ─── Account purge ───────────────────────────────────────────────────────────
+
+def purge_stages(user_id):
+    """Ordered ``(name, queryset, before_delete)`` stages; dependents before parents."""
+    through = User.friends.through
+    own_posts = Q(post__author_id=user_id)
+    return [
+        ('notifications_received', Notification.objects.filter(recipient_id=user_id), None),
+        ('notifications_sent',
+         Notification.objects.filter(verb=Notification.MESSAGE, last_actor_id=user_id),
+         _unread_notifications_hook),
+        ('affinities', Affinity.objects.filter(Q(viewer_id=user_id) | Q(author_id=user_id)), None),
+        ('likes_given', Like.objects.filter(user_id=user_id), _likes_given_hook(user_id)),
+        ('comments_given', Comment.objects.filter(author_id=user_id), _comments_given_hook(user_id)),
+        ('messages', Message.objects.filter(Q(sender_id=user_id) | Q(receiver_id=user_id)), None),
+        ('archived_messages',
+         ArchivedMessage.objects.filter(Q(sender_id=user_id) | Q(receiver_id=user_id)), None),
+        ('thread_messages', ThreadMessage.objects.filter(sender_id=user_id), None),
+        ('thread_memberships', ThreadMember.objects.filter(user_id=user_id), _thread_memberships_hook),
+        ('friendships', through.objects.filter(Q(from_user_id=user_id) | Q(to_user_id=user_id)),
+         _friendships_hook(user_id)),
+        ('post_likes', Like.objects.filter(own_posts), None),
+        ('post_comments', Comment.objects.filter(own_posts), None),
+        ('post_notifications', Notification.objects.filter(own_posts), _unread_notifications_hook),
+        ('post_trending', TrendingBucket.objects.filter(own_posts), None),
+        ('posts', Post.objects.filter(author_id=user_id), _posts_hook),
+    ]
+
+
+def enqueue_purge(user):
+    """Deactivate ``user`` immediately and queue the heavy deletion for a worker."""
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    job, _ = PurgeJob.objects.get_or_create(
+        user_id=user.pk, status__in=[PurgeJob.QUEUED, PurgeJob.RUNNING],
+        defaults={'username': user.username},
+    )
+    return job
+
+
+def run_purge(job, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Execute (or resume) ``job``. ``report(stage, deleted_so_far)`` is called per batch."""
+    job.status = PurgeJob.RUNNING
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'updated_at'])
+
+    stages = purge_stages(job.user_id)
+    names = [name for name, _, _ in stages] + ['account']
+    start = names.index(job.stage) if job.stage in names else 0
+
+    try:
+        for name, queryset, hook in stages[start:]:
+            _enter_stage(job, name)
+
+            def on_batch(deleted, name=name):
+                job.progress[name] = job.progress.get(name, 0) + deleted
+                job.save(update_fields=['progress', 'updated_at'])
+                if report is not None:
+                    report(name, job.progress[name])
+
+            drain(queryset, batch_size, before_delete=hook, on_batch=on_batch)
+
+        _enter_stage(job, 'account')
+        with transaction.atomic():
+            avatar = User.objects.filter(pk=job.user_id).values_list('avatar', flat=True).first()
+            # Heavy relations are gone, so the collector only sees a handful of rows here.
+            deleted, _ = User.objects.filter(pk=job.user_id).delete()
+            _remove_media_on_commit([avatar])
+        job.progress['account'] = deleted
+        if report is not None:
+            report('account', deleted)
+    except Exception as exc:
+        job.status = PurgeJob.FAILED
+        job.error = repr(exc)
+        job.save(update_fields=['status', 'error', 'progress', 'updated_at'])
+        raise
+
+    job.status = PurgeJob.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'finished_at', 'updated_at'])
+    return job
+
+
+def _enter_stage(job, name):
+    if job.stage != name:
+        job.stage = name
+        job.save(update_fields=['stage', 'updated_at'])
+
+
+# ─── Full wipe (seed_data --clear) ───────────────────────────────────────────
+
+def clear_all_content(batch_size=DEFAULT_BATCH_SIZE, keep_superusers=True):
+    """Batched equivalent of deleting every content table and non-superuser account."""
+    users = User.objects.exclude(is_superuser=True) if keep_superusers else User.objects.all()
+    doomed = users.values('pk')
+    through = User.friends.through
+    counts = {
+        'notifications': drain(Notification.objects.all(), batch_size),
+        'trending_buckets': drain(TrendingBucket.objects.all(), batch_size),
+        'affinities': drain(Affinity.objects.all(), batch_size),
+        'messages': drain(Message.objects.all(), batch_size),
+        'archived_messages': drain(ArchivedMessage.objects.all(), batch_size),
+        'thread_messages': drain(ThreadMessage.objects.all(), batch_size),
+        'thread_memberships': drain(ThreadMember.objects.all(), batch_size),
+        'threads': drain(Thread.objects.all(), batch_size),
+        'comments': drain(Comment.objects.all(), batch_size),
+        'likes': drain(Like.objects.all(), batch_size),
+        'posts': drain(Post.objects.all(), batch_size, before_delete=_posts_hook),
+        'friendships': drain(
+            through.objects.filter(Q(from_user__in=doomed) | Q(to_user__in=doomed)), batch_size
+        ),
+    }
+
+    deleted_users = 0
+    while True:
+        with transaction.atomic():
+            batch = list(users.order_by('pk').values_list('pk', 'avatar')[:batch_size])
+            if not batch:
+                break
+            User.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+            _remove_media_on_commit(avatar for _, avatar in batch)
+        deleted_users += len(batch)
+    counts['users'] = deleted_users
+
+    # Whoever survives owns no content any more.
+    User.objects.update(posts_count=0, likes_received_count=0, unread_notifications_count=0)
+    refresh_friends_count(User.objects.all())
+    return counts
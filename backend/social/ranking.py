@@ -0,0 +1,220 @@
+"""
+Engagement-ranked feed scoring.
+
+Candidates are pulled as plain value rows in one query, turned into NumPy
+columns and scored in a single vectorised pass:
+
+    score = W_RECENCY  * 0.5 ** (age_hours / HALF_LIFE_HOURS)
+          + W_VELOCITY * log1p(weighted recent engagement per hour)
+          + W_AFFINITY * viewer→author affinity (precomputed, 0..1)
+
+NumPy is imported inside the scoring functions rather than at module level: it
+is the heaviest import on the URLconf path and would otherwise be paid by
+every worker at boot (see ``import_report``).
+
+Only the newest ``FEED_CANDIDATES`` posts of the last ``CANDIDATE_WINDOW_DAYS``
+are ranked; ``feed_post_ids`` appends every older post after them in plain
+chronological order, so the feed still reaches the whole history.
+
+Affinity rows are produced offline by ``python manage.py refresh_affinity``.
+The candidate query is the same for every viewer and is shared through
+``social.cache`` for ``CANDIDATES_TTL`` seconds (dropped when a post is created
+or deleted); engagement counts may lag by that much.
+"""
+
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import cache
+from .models import Affinity, Comment, Like, Message, Post, User
+
+# ─── Tunables ────────────────────────────────────────────────────────────────
+FEED_CANDIDATES = 500           # newest posts considered for ranking
+CANDIDATE_WINDOW_DAYS = 14
+VELOCITY_WINDOW_HOURS = 6
+HALF_LIFE_HOURS = 12.0
+CANDIDATES_TTL = 15             # seconds the shared candidate rows may be reused
+
+W_RECENCY = 1.0
+W_VELOCITY = 0.6
+W_AFFINITY = 1.2
+COMMENT_WEIGHT = 2.0            # a comment counts as this many likes
+SELF_AFFINITY = 0.5             # viewer's own posts
+
+AFFINITY_WINDOW_DAYS = 90
+AFFINITY_SCALE = 10.0           # raw interactions giving ~63% affinity
+AFFINITY_LIKE = 1.0
+AFFINITY_COMMENT = 2.0
+AFFINITY_MESSAGE = 3.0
+AFFINITY_FRIEND = 5.0
+
+
+# ─── Scoring ─────────────────────────────────────────────────────────────────
+
+def score_candidates(age_hours, likes, comments, recent_likes, recent_comments, affinity):
+    """Vectorised score for a batch; every argument is a 1-D array of equal length."""
+    import numpy as np
+
+    age_hours = np.maximum(np.asarray(age_hours, dtype=np.float64), 0.0)
+    recency = np.exp2(-age_hours / HALF_LIFE_HOURS)
+
+    recent = np.asarray(recent_likes, dtype=np.float64) + COMMENT_WEIGHT * np.asarray(recent_comments, dtype=np.float64)
+    total = np.asarray(likes, dtype=np.float64) + COMMENT_WEIGHT * np.asarray(comments, dtype=np.float64)
+    # Recent engagement rate, with lifetime engagement as a weak prior.
+    velocity = np.log1p(recent / VELOCITY_WINDOW_HOURS + total / (age_hours + 2.0))
+
+    return (W_RECENCY * recency
+            + W_VELOCITY * velocity
+            + W_AFFINITY * np.asarray(affinity, dtype=np.float64))
+
+
+def _engagement_count(model, since=None):
+    """Per-post row count of ``model`` as a correlated subquery (no join fan-out)."""
+    rows = model.objects.filter(post=OuterRef('pk'))
+    if since is not None:
+        rows = rows.filter(created_at__gte=since)
+    return Coalesce(Subquery(rows.order_by().values('post').annotate(n=Count('pk')).values('n')), 0)
+
+
+def _candidate_rows(limit):
+    now = timezone.now()
+    since = now - timedelta(hours=VELOCITY_WINDOW_HOURS)
+    # Separate subqueries: joining likes and comments together would multiply
+    # them into a likes × comments row product per post.
+    return list(
+        Post.objects
+        .filter(created_at__gte=now - timedelta(days=CANDIDATE_WINDOW_DAYS))
+        .order_by('-created_at', '-id')
+        .annotate(
+            n_likes=_engagement_count(Like),
+            n_comments=_engagement_count(Comment),
+            n_recent_likes=_engagement_count(Like, since),
+            n_recent_comments=_engagement_count(Comment, since),
+        )
+        .values_list('id', 'author_id', 'created_at',
+                     'n_likes', 'n_comments', 'n_recent_likes', 'n_recent_comments')[:limit]
+    )
+
+
+def candidates_cache_key(limit=FEED_CANDIDATES):
+    return f'ranking:candidates:{limit}'
+
+
+def candidate_rows(limit=FEED_CANDIDATES):
+    """
+    Viewer-independent candidate rows with engagement counts.  This aggregate is
+    the expensive part of ranking and identical for every viewer, so it is
+    shared through the tiered cache for ``CANDIDATES_TTL`` seconds.
+    """
+    return cache.get_or_set(candidates_cache_key(limit), lambda: _candidate_rows(limit), CANDIDATES_TTL)
+
+
+def invalidate_candidates():
+    cache.delete(candidates_cache_key())
+
+
+def rank_feed(viewer, limit=FEED_CANDIDATES, rows=None):
+    """
+    Return candidate post ids for ``viewer`` ordered by descending score.
+    ``rows`` defaults to ``candidate_rows(limit)``.
+    """
+    import numpy as np
+
+    now = timezone.now()
+    if rows is None:
+        rows = candidate_rows(limit)
+    if not rows:
+        return []
+
+    ids, author_ids, created, likes, comments, recent_likes, recent_comments = zip(*rows)
+    ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+    author_ids = np.fromiter(author_ids, dtype=np.int64, count=len(rows))
+    now_ts = now.timestamp()
+    age_hours = np.fromiter((now_ts - c.timestamp() for c in created), dtype=np.float64, count=len(rows)) / 3600.0
+
+    affinity = affinity_vector(viewer, author_ids)
+    scores = score_candidates(age_hours, likes, comments, recent_likes, recent_comments, affinity)
+    # Stable sort keeps recency order among ties (rows arrive newest first).
+    order = np.argsort(-scores, kind='stable')
+    return ids[order].tolist()
+
+
+def feed_post_ids(viewer, limit=FEED_CANDIDATES):
+    """
+    The full feed: ranked candidates first, then every older post newest first
+    (posts before the candidate window, or beyond ``FEED_CANDIDATES``).
+    """
+    rows = candidate_rows(limit)
+    older = Post.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+    if rows:
+        # Rows are newest first, so the last one bounds the candidate range.
+        oldest_id, oldest_created = rows[-1][0], rows[-1][2]
+        older = older.filter(Q(created_at__lt=oldest_created) | Q(created_at=oldest_created, id__lt=oldest_id))
+    # Rank the same rows the cutoff came from; a second cache read could see a
+    # refreshed window and drop or repeat posts at the boundary.
+    return rank_feed(viewer, rows=rows) + list(older)
+
+
+def affinity_vector(viewer, author_ids):
+    """Map an array of author ids to the viewer's affinity scores."""
+    import numpy as np
+
+    unique_authors = np.unique(author_ids)
+    known = dict(
+        Affinity.objects
+        .filter(viewer=viewer, author_id__in=unique_authors.tolist())
+        .values_list('author_id', 'score')
+    )
+    table = np.array([known.get(a, 0.0) for a in unique_authors.tolist()], dtype=np.float64)
+    table[unique_authors == viewer.pk] = SELF_AFFINITY
+    return table[np.searchsorted(unique_authors, author_ids)]
+
+
+# ─── Affinity refresh ────────────────────────────────────────────────────────
+
+def compute_affinities(window_days=AFFINITY_WINDOW_DAYS):
+    """Aggregate viewer → author interactions into normalised 0..1 scores."""
+    since = timezone.now() - timedelta(days=window_days)
+    raw = {}
+
+    def add(viewer_id, author_id, amount):
+        if viewer_id != author_id:
+            raw[(viewer_id, author_id)] = raw.get((viewer_id, author_id), 0.0) + amount
+
+    likes = (Like.objects.filter(created_at__gte=since)
+             .values_list('user_id', 'post__author_id').annotate(n=Count('id')))
+    for viewer_id, author_id, n in likes:
+        add(viewer_id, author_id, AFFINITY_LIKE * n)
+
+    comments = (Comment.objects.filter(created_at__gte=since)
+                .values_list('author_id', 'post__author_id').annotate(n=Count('id')))
+    for viewer_id, author_id, n in comments:
+        add(viewer_id, author_id, AFFINITY_COMMENT * n)
+
+    messages = (Message.objects.filter(created_at__gte=since)
+                .values_list('sender_id', 'receiver_id').annotate(n=Count('id')))
+    for viewer_id, author_id, n in messages:
+        add(viewer_id, author_id, AFFINITY_MESSAGE * n)
+
+    friendships = User.friends.through.objects.values_list('from_user_id', 'to_user_id')
+    for viewer_id, author_id in friendships:
+        add(viewer_id, author_id, AFFINITY_FRIEND)
+
+    return {pair: 1.0 - math.exp(-value / AFFINITY_SCALE) for pair, value in raw.items()}
+
+
+def refresh_affinities(window_days=AFFINITY_WINDOW_DAYS, batch_size=1000):
+    """Replace all stored affinity rows; returns the number written."""
+    scores = compute_affinities(window_days)
+    with transaction.atomic():
+        Affinity.objects.all().delete()
+        Affinity.objects.bulk_create(
+            (Affinity(viewer_id=v, author_id=a, score=s) for (v, a), s in scores.items()),
+            batch_size=batch_size,
+        )
+    return len(scores)
@@ -0,0 +1,34 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's ``JSONRenderer`` that encodes with orjson.
+
+    Output is byte-for-byte compatible for API payloads: datetimes and any other
+    non-native types are handed back to DRF's own encoder, so timestamps keep the
+    ``...Z`` millisecond format, and U+2028 / U+2029 are escaped as DRF does.
+    The one difference is non-finite floats: orjson writes NaN / Infinity as
+    ``null`` where DRF's ``STRICT_JSON`` raises.  Falls back to the stock
+    renderer when orjson is not installed or an indented response is requested.
+    """
+    _fallback_encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(
+            data,
+            default=self._fallback_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Like DRF, escape the line/paragraph separators so the output is also valid JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,209 @@
+"""
+Fast read-only rendering of posts and comments.
+
+Builds the same payload as ``PostSerializer`` / ``CommentSerializer`` /
+``UserMiniSerializer`` directly from ``values_list()`` rows, skipping DRF's
+per-field machinery.  Field mappings are compiled once at import time into
+``(output_key, column_index, converter)`` tuples; a page of posts costs a fixed
+four queries (posts+authors, like counts, viewer likes, comments+authors).
+
+Only use this for reads — writes still go through the serializers.
+"""
+
+import asyncio
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils.encoding import filepath_to_uri
+
+from .models import Comment, Like, Post
+
+
+def _datetime(value):
+    # Mirrors rest_framework.fields.DateTimeField.to_representation (ISO 8601, UTC as "Z").
+    if not value:
+        return None
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _identity(value):
+    return value
+
+
+class RowMapping:
+    """Precompiled mapping from a flat ``values_list`` row to a payload dict."""
+
+    def __init__(self, fields, prefix=''):
+        # fields: sequence of (output_key, model_field, converter-or-None)
+        self.columns = tuple(prefix + field for _, field, _ in fields)
+        self.fields = tuple(
+            (key, index, converter or _identity)
+            for index, (key, _, converter) in enumerate(fields)
+        )
+
+    def build(self, row, offset=0, **converters):
+        # Per-request converters (e.g. absolute media URLs) override by key.
+        return {
+            key: converters.get(key, converter)(row[offset + index])
+            for key, index, converter in self.fields
+        }
+
+
+USER_MINI = (
+    ('id', 'id', None),
+    ('username', 'username', None),
+    ('first_name', 'first_name', None),
+    ('last_name', 'last_name', None),
+    ('avatar', 'avatar', None),
+)
+POST = RowMapping((
+    ('id', 'id', None),
+    ('content', 'content', None),
+    ('image', 'image', None),
+    ('created_at', 'created_at', _datetime),
+    ('updated_at', 'updated_at', _datetime),
+    ('version', 'version', None),
+))
+POST_AUTHOR = RowMapping(USER_MINI, prefix='author__')
+COMMENT = RowMapping((
+    ('id', 'id', None),
+    ('post', 'post_id', None),
+    ('content', 'content', None),
+    ('created_at', 'created_at', _datetime),
+))
+COMMENT_AUTHOR = RowMapping(USER_MINI, prefix='author__')
+USER = RowMapping(USER_MINI)
+MESSAGE = RowMapping((
+    ('id', 'id', None),
+    ('content', 'content', None),
+    ('is_read', 'is_read', None),
+    ('created_at', 'created_at', _datetime),
+))
+MESSAGE_SENDER = RowMapping(USER_MINI, prefix='sender__')
+MESSAGE_RECEIVER = RowMapping(USER_MINI, prefix='receiver__')
+MESSAGE_COLUMNS = MESSAGE.columns + MESSAGE_SENDER.columns + MESSAGE_RECEIVER.columns
+
+
+def media_url_builder(request=None):
+    """Return a converter turning a stored file name into the URL DRF would emit."""
+    base = settings.MEDIA_URL
+
+    def convert(name):
+        if not name:
+            return None
+        url = base + filepath_to_uri(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def _post_queries(post_ids, user):
+    """The four independent querysets behind one page of posts."""
+    rows = Post.objects.filter(pk__in=post_ids).values_list(*POST.columns, *POST_AUTHOR.columns)
+    likes = (Like.objects.filter(post_id__in=post_ids)
+             .values_list('post_id').annotate(n=Count('id')).order_by())
+    liked = (Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+             if user is not None and user.is_authenticated else Like.objects.none())
+    comment_rows = (
+        Comment.objects.filter(post_id__in=post_ids)
+        .order_by('created_at', 'id')
+        .values_list(*COMMENT.columns, *COMMENT_AUTHOR.columns)
+    )
+    return rows, likes, liked, comment_rows
+
+
+def _assemble_posts(post_ids, rows, likes, liked, comment_rows, request):
+    media = media_url_builder(request)
+    post_width = len(POST.columns)
+    posts = {}
+    for row in rows:
+        payload = POST.build(row, image=media)
+        payload['author'] = POST_AUTHOR.build(row, offset=post_width, avatar=media)
+        posts[payload['id']] = payload
+
+    likes = dict(likes)
+    liked = set(liked)
+    comments = {pk: [] for pk in posts}
+    comment_width = len(COMMENT.columns)
+    for row in comment_rows:
+        payload = COMMENT.build(row)
+        comments[payload['post']].append({
+            'id': payload['id'],
+            'author': COMMENT_AUTHOR.build(row, offset=comment_width, avatar=media),
+            'post': payload['post'],
+            'content': payload['content'],
+            'created_at': payload['created_at'],
+        })
+
+    result = []
+    for pk in post_ids:
+        post = posts.get(pk)
+        if post is None:
+            continue
+        thread = comments[pk]
+        result.append({
+            'id': pk,
+            'author': post['author'],
+            'content': post['content'],
+            'image': post['image'],
+            'likes_count': likes.get(pk, 0),
+            'comments_count': len(thread),
+            'comments': thread,
+            'is_liked': pk in liked,
+            'created_at': post['created_at'],
+            'updated_at': post['updated_at'],
+            'version': post['version'],
+        })
+    return result
+
+
+def render_posts(post_ids, request=None):
+    """Render posts in ``post_ids`` order, matching ``PostSerializer`` output."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return []
+    user = request.user if request is not None else None
+    results = [list(qs) for qs in _post_queries(post_ids, user)]
+    return _assemble_posts(post_ids, *results, request)
+
+
+async def arender_posts(post_ids, request=None, user=None):
+    """
+    Async ``render_posts``: the four queries are awaited together with
+    ``asyncio.gather``. ``user`` overrides ``request.user`` for plain Django
+    requests authenticated outside DRF.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return []
+    if user is None and request is not None:
+        user = request.user
+    results = await asyncio.gather(*(alist(qs) for qs in _post_queries(post_ids, user)))
+    return _assemble_posts(post_ids, *results, request)
+
+
+async def alist(queryset):
+    return [row async for row in queryset]
+
+
+def build_user(row, request=None):
+    """``UserMiniSerializer`` payload from a ``USER.columns`` row."""
+    return USER.build(row, avatar=media_url_builder(request))
+
+
+def build_message(row, request=None):
+    """``MessageSerializer`` payload from a ``MESSAGE_COLUMNS`` row."""
+    media = media_url_builder(request)
+    payload = MESSAGE.build(row)
+    sender_at = len(MESSAGE.columns)
+    receiver_at = sender_at + len(MESSAGE_SENDER.columns)
+    return {
+        'id': payload['id'],
+        'sender': MESSAGE_SENDER.build(row, offset=sender_at, avatar=media),
+        'receiver': MESSAGE_RECEIVER.build(row, offset=receiver_at, avatar=media),
+        'content': payload['content'],
+        'is_read': payload['is_read'],
+        'created_at': payload['created_at'],
+    }
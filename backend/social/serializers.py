@@ -1,13 +1,13 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Post, Like, Comment, Message
+from .models import Post, Like, Comment, Message, Notification, ThreadMember, ThreadMessage
 
 User = get_user_model()
 
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
-    friends_count = serializers.SerializerMethodField()
+    friends_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -15,9 +15,6 @@ class UserSerializer(serializers.ModelSerializer):
                   'bio', 'avatar', 'friends_count', 'password', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-    def get_friends_count(self, obj):
-        return obj.friends.count()
-
     def create(self, validated_data):
         password = validated_data.pop('password')
         user = User(**validated_data)
@@ -35,6 +32,16 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ProfileSerializer(serializers.ModelSerializer):
+    """Profile header; every count is a maintained column, so this costs no queries."""
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'bio', 'avatar',
+                  'friends_count', 'posts_count', 'likes_received_count', 'created_at']
+        read_only_fields = fields
+
+
 class UserMiniSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -60,8 +67,8 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model = Post
         fields = ['id', 'author', 'content', 'image', 'likes_count',
-                  'comments_count', 'comments', 'is_liked', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'author', 'created_at', 'updated_at']
+                  'comments_count', 'comments', 'is_liked', 'created_at', 'updated_at', 'version']
+        read_only_fields = ['id', 'author', 'created_at', 'updated_at', 'version']
 
     def get_is_liked(self, obj):
         request = self.context.get('request')
@@ -70,6 +77,15 @@ class PostSerializer(serializers.ModelSerializer):
         return False
 
 
+class PostEditSerializer(serializers.ModelSerializer):
+    """Edit payload and its minimal response: no author, counts or comment thread."""
+
+    class Meta:
+        model = Post
+        fields = ['id', 'content', 'image', 'version', 'updated_at']
+        read_only_fields = ['id', 'version', 'updated_at']
+
+
 class LikeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Like
@@ -90,6 +106,51 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'sender', 'is_read', 'created_at']
 
 
+class ThreadSerializer(serializers.ModelSerializer):
+    """Inbox entry, built from the viewer's `ThreadMember` row."""
+    id = serializers.IntegerField(source='thread_id', read_only=True)
+    title = serializers.CharField(source='thread.title', read_only=True)
+    member_count = serializers.IntegerField(source='thread.member_count', read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ThreadMember
+        fields = ['id', 'title', 'member_count', 'unread_count', 'last_read_id', 'last_message_at']
+        read_only_fields = fields
+
+
+class ThreadDetailSerializer(ThreadSerializer):
+    members = UserMiniSerializer(source='thread.members', many=True, read_only=True)
+
+    class Meta(ThreadSerializer.Meta):
+        fields = ThreadSerializer.Meta.fields + ['members']
+        read_only_fields = fields
+
+
+class ThreadMembersSerializer(serializers.Serializer):
+    member_ids = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(is_active=True), many=True, allow_empty=False
+    )
+
+
+class ThreadCreateSerializer(ThreadMembersSerializer):
+    title = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+
+
+class ThreadReadSerializer(serializers.Serializer):
+    # Message ids are 64-bit; anything larger can't be one (and would overflow SQLite).
+    up_to = serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1, required=False)
+
+
+class ThreadMessageSerializer(serializers.ModelSerializer):
+    sender = UserMiniSerializer(read_only=True)
+
+    class Meta:
+        model = ThreadMessage
+        fields = ['id', 'thread', 'sender', 'content', 'created_at']
+        read_only_fields = ['id', 'thread', 'sender', 'created_at']
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
     password2 = serializers.CharField(write_only=True)
@@ -109,4 +170,37 @@ class RegisterSerializer(serializers.ModelSerializer):
         user = User(**validated_data)
         user.set_password(password)
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+class NotificationSerializer(serializers.ModelSerializer):
+    last_actor = UserMiniSerializer(read_only=True)
+    text = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'verb', 'post', 'last_actor', 'actor_count', 'event_count',
+                  'text', 'is_read', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_text(self, obj):
+        actor = obj.last_actor
+        name = (actor.first_name or actor.username) if actor else 'Someone'
+        if obj.verb == Notification.MESSAGE:
+            plural = 's' if obj.event_count != 1 else ''
+            return f"{name} sent you {obj.event_count} new message{plural}"
+        others = obj.actor_count - 1
+        action = 'liked' if obj.verb == Notification.LIKE else 'commented on'
+        if others > 0:
+            return f"{name} and {others} other{'s' if others != 1 else ''} {action} your post"
+        return f"{name} {action} your post"
+
+
+class NotificationMarkReadSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1),
+                                required=False)
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if not attrs['all'] and 'ids' not in attrs:
+            raise serializers.ValidationError('Provide "ids" as a list or "all": true.')
+        return attrs
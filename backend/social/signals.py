@@ -0,0 +1,58 @@
+"""
+Keeps the denormalized counters on ``User`` in step with the rows they count.
+
+Each handler issues a single relative ``UPDATE`` (``F() ± 1``), so concurrent
+writers never lose increments and no counter ever needs a ``COUNT(*)`` on read.
+
+Deletes are deliberately not hooked: a ``post_delete`` receiver forces the
+collector to load and signal every cascaded row instead of issuing one bulk
+``DELETE``.  The delete sites (``PostViewSet``, ``social.purge``) adjust the
+counters themselves with ``purge.decrement_counters``.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .models import Like, Post, User
+
+
+def _bump(queryset, field, amount):
+    queryset.update(**{field: Greatest(F(field) + amount, 0)})
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        _bump(User.objects.filter(pk=instance.author_id), 'posts_count', 1)
+
+
+@receiver(post_save, sender=Like)
+def like_created(sender, instance, created, **kwargs):
+    if created:
+        _bump(User.objects.filter(posts=instance.post_id), 'likes_received_count', 1)
+
+
+@receiver(m2m_changed, sender=User.friends.through)
+def friends_changed(sender, instance, action, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # clear() does not report pk_set; remember who is about to be dropped.
+        instance._cleared_friend_ids = list(instance.friends.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if action == 'post_clear':
+            affected = set(getattr(instance, '_cleared_friend_ids', ())) | {instance.pk}
+        else:
+            affected = set(pk_set) | {instance.pk}
+        # Symmetrical add() inserts the mirror rows after this signal fires, so
+        # recount once the surrounding transaction has committed.
+        transaction.on_commit(lambda: refresh_friends_count(User.objects.filter(pk__in=affected)))
+
+
+def refresh_friends_count(queryset):
+    """Recompute ``friends_count`` for ``queryset`` from the friendship rows."""
+    through = User.friends.through
+    counts = (through.objects.filter(from_user=OuterRef('pk'))
+              .order_by().values('from_user').annotate(n=Count('pk')).values('n'))
+    queryset.update(friends_count=Coalesce(Subquery(counts), 0))
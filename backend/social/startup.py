@@ -0,0 +1,85 @@
+"""
+Worker cold-start measurement.
+
+``measure_boot`` starts a fresh interpreter with ``-X importtime`` that does what
+a WSGI worker does before serving its first request — import ``backend.wsgi``
+(settings, app registry, middleware) and load the URLconf (every view module) —
+and returns the wall time plus one ``ImportRecord`` per imported module.
+
+Used by ``python manage.py import_report`` and the cold-start test in
+``social/tests.py``.
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+BOOT_SCRIPT = """
+import importlib, os, sys, time
+started = time.perf_counter()
+
+# -X importtime only logs imports made through __import__; route Django's
+# import_module() calls (settings, apps, models, URLconf) through it as well.
+_import_module = importlib.import_module
+def import_module(name, package=None):
+    if package is None:
+        __import__(name)
+        return sys.modules[name]
+    return _import_module(name, package)
+importlib.import_module = import_module
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+from backend.wsgi import application
+if {load_urls}:
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+print(time.perf_counter() - started)
+"""
+
+# Heavy optional libraries that must only load on the paths that use them.
+LAZY_MODULES = ('numpy', 'PIL', 'pyarrow')
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+class ImportRecord:
+    """One ``-X importtime`` line: times in microseconds, ``depth`` = nesting level."""
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, name, self_us, cumulative_us, depth):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+    @property
+    def package(self):
+        return self.name.partition('.')[0]
+
+
+def parse_importtime(stderr):
+    """Turn ``-X importtime`` output into ``ImportRecord``s in import order."""
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def measure_boot(load_urls=True, importtime=True):
+    """Return ``(seconds, records)`` for one cold worker boot in a subprocess."""
+    env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    env.pop('DJANGO_SETTINGS_MODULE', None)
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', BOOT_SCRIPT.format(load_urls=load_urls)]
+    result = subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    seconds = float(result.stdout.strip().splitlines()[-1])
+    return seconds, parse_importtime(result.stderr)
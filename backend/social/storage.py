@@ -0,0 +1,61 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 64    # hex sha256
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that names every upload after the SHA-256 of its bytes.
+
+    ``posts/holiday.jpg`` is stored as ``posts/3f/3f9a…c1.jpg``; uploading the
+    same bytes again (under any name) reuses the existing file instead of
+    writing a copy.  Because a name always maps to the same content, served
+    files can be cached forever (see ``social.media.serve_media``).
+
+    Several rows may share one file, so files must only be removed once nothing
+    references them (``social.purge.remove_orphaned_media``).
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Identical name ⇒ identical bytes, so a concurrent writer racing us to
+        # the same path is harmless.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(*args, **kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        digest = self.hash_content(content)
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = os.path.splitext(filename)[1].lower()
+        hashed_name = posixpath.join(directory, digest[:2], digest + extension)
+        if not self.exists(hashed_name):
+            super().save(hashed_name, content, max_length=max_length)
+        return hashed_name
+
+    def get_available_name(self, name, max_length=None):
+        # Names are content hashes; an existing file already holds these bytes.
+        return name
+
+    @staticmethod
+    def hash_content(content):
+        sha = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in (content.chunks() if hasattr(content, 'chunks') else iter(lambda: content.read(65536), b'')):
+            sha.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return sha.hexdigest()
+
+
+def is_content_addressed(name):
+    """True when ``name`` looks like ``<dir>/<ab>/<sha256><ext>``."""
+    stem = os.path.splitext(posixpath.basename(name))[0]
+    parent = posixpath.basename(posixpath.dirname(name))
+    return (len(stem) == HASH_LENGTH and parent == stem[:2]
+            and all(c in '0123456789abcdef' for c in stem))
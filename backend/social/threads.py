@@ -0,0 +1,114 @@
+"""
+Group conversations.
+
+A ``Thread`` has members (``ThreadMember``) and messages (``ThreadMessage``).
+Read state is one cursor per member, ``last_read_id``: reading any number of
+messages is a single-row ``UPDATE``, and unread counts are an indexed range
+count of ``thread_message_page_idx`` above the cursor.
+
+Each member row carries a copy of the thread's ``last_message_at``.  Posting
+refreshes it for every member in one ``UPDATE`` (fan-out on write), which keeps
+the inbox a single range scan of ``thread_member_inbox_idx`` however many
+threads or members there are.
+"""
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, F, IntegerField, Max, OuterRef, PositiveBigIntegerField, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Thread, ThreadMember, ThreadMessage
+
+
+def latest_message_id(thread_id):
+    return ThreadMessage.objects.filter(thread_id=thread_id).aggregate(m=Max('id'))['m'] or 0
+
+
+def _recount_members(thread_id):
+    Thread.objects.filter(pk=thread_id).update(
+        member_count=Subquery(
+            ThreadMember.objects.filter(thread_id=thread_id).order_by()
+            .values('thread_id').annotate(n=Count('pk')).values('n')
+        )
+    )
+
+
+@transaction.atomic
+def create_thread(creator, member_ids, title=''):
+    """Create a thread holding ``creator`` plus ``member_ids``; returns the creator's membership."""
+    now = timezone.now()
+    thread = Thread.objects.create(title=title, created_by=creator, last_message_at=now)
+    user_ids = {creator.pk, *member_ids}
+    ThreadMember.objects.bulk_create(
+        [ThreadMember(thread=thread, user_id=user_id, last_message_at=now) for user_id in user_ids]
+    )
+    thread.member_count = len(user_ids)
+    thread.save(update_fields=['member_count'])
+    return ThreadMember.objects.select_related('thread').get(thread=thread, user=creator)
+
+
+@transaction.atomic
+def add_members(thread, user_ids):
+    """Add ``user_ids``; newcomers start with the existing history marked read."""
+    last_read = latest_message_id(thread.pk)
+    ThreadMember.objects.bulk_create(
+        [ThreadMember(thread=thread, user_id=user_id, last_read_id=last_read,
+                      last_message_at=thread.last_message_at) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    _recount_members(thread.pk)
+
+
+@transaction.atomic
+def leave(membership):
+    thread_id = membership.thread_id
+    membership.delete()
+    _recount_members(thread_id)
+
+
+@transaction.atomic
+def post_message(membership, content):
+    """Append a message, bump every member's inbox position and the sender's cursor."""
+    message = ThreadMessage.objects.create(
+        thread_id=membership.thread_id, sender_id=membership.user_id, content=content
+    )
+    Thread.objects.filter(pk=membership.thread_id).update(last_message_at=message.created_at)
+    ThreadMember.objects.filter(thread_id=membership.thread_id).update(
+        last_message_at=message.created_at,
+        last_read_id=Case(
+            When(user_id=membership.user_id, then=Value(message.pk)),
+            default=F('last_read_id'),
+            output_field=PositiveBigIntegerField(),
+        ),
+    )
+    return message
+
+
+def mark_read(membership, up_to=None):
+    """
+    Advance the read cursor (never backwards) to ``up_to`` or the latest
+    message; ``up_to`` is clamped to the latest message so a cursor past the
+    end can't hide messages posted later.
+    """
+    latest = latest_message_id(membership.thread_id)
+    up_to = latest if up_to is None else min(up_to, latest)
+    ThreadMember.objects.filter(pk=membership.pk).update(
+        last_read_id=Greatest(F('last_read_id'), Value(up_to), output_field=PositiveBigIntegerField())
+    )
+    membership.refresh_from_db(fields=['last_read_id'])
+    return membership.last_read_id
+
+
+def inbox(user):
+    """The user's memberships, most recently active first, annotated with ``unread_count``."""
+    unread = (
+        ThreadMessage.objects.filter(thread_id=OuterRef('thread_id'), id__gt=OuterRef('last_read_id'))
+        .order_by().values('thread_id').annotate(n=Count('pk')).values('n')
+    )
+    return (
+        ThreadMember.objects.filter(user=user)
+        .select_related('thread')
+        .annotate(unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), 0))
+    )
@@ -0,0 +1,231 @@
+"""
+Hot-post tracking with in-memory sliding-window counters.
+
+Each window is a ring of fixed-width time buckets (60 × 1 min for the last
+hour, 24 × 1 h for the last day) plus a running total per post.  Expired
+buckets are subtracted from the totals as the window slides, and every change
+to a total pushes ``(-total, post_id)`` onto a heap.  Stale heap entries are
+discarded lazily when reading, so ``top(k)`` touches roughly ``k`` entries and
+never scans the ``Like`` or ``Comment`` tables.
+
+Counters live per process.  Every ``PERSIST_SECONDS`` a background thread adds
+the accumulated deltas onto ``TrendingBucket`` rows and reloads the windows
+from the table, so all workers converge on the merged counts.  Request threads
+only ever touch memory; a failed persist is logged and retried with the next
+one, never surfaced to the like/comment that produced the event.
+"""
+
+import atexit
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Post, TrendingBucket
+
+WINDOWS = {
+    'hour': (3600, 60),          # span seconds, bucket seconds
+    'day': (86400, 3600),
+}
+LIKE_WEIGHT = 1
+COMMENT_WEIGHT = 2
+PERSIST_SECONDS = 30
+
+logger = logging.getLogger('social.trending')
+
+
+class SlidingWindow:
+    """Bucketed event counts over the trailing ``span`` seconds with top-K reads."""
+
+    def __init__(self, span, bucket_seconds):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = span // bucket_seconds
+        self.buckets = deque()      # (bucket_start, {post_id: count})
+        self.totals = {}
+        self.heap = []
+
+    def bucket_for(self, ts):
+        return int(ts) // self.bucket_seconds * self.bucket_seconds
+
+    def add(self, post_id, amount, ts):
+        start = self.bucket_for(ts)
+        self._advance(start)
+        if not self.buckets or self.buckets[-1][0] != start:
+            self.buckets.append((start, {}))
+        counts = self.buckets[-1][1]
+        counts[post_id] = counts.get(post_id, 0) + amount
+        self._set_total(post_id, self.totals.get(post_id, 0) + amount)
+        if len(self.heap) > 2 * len(self.totals) + 64:
+            self.heap = [(-total, pid) for pid, total in self.totals.items()]
+            heapq.heapify(self.heap)
+
+    def top(self, k, ts):
+        self._advance(self.bucket_for(ts))
+        result, keep, seen = [], [], set()
+        while self.heap and len(result) < k:
+            entry = heapq.heappop(self.heap)
+            score, post_id = -entry[0], entry[1]
+            # Stale (superseded total) or duplicate entries are simply dropped.
+            if post_id in seen or self.totals.get(post_id) != score:
+                continue
+            seen.add(post_id)
+            keep.append(entry)
+            if score > 0:
+                result.append((post_id, score))
+        for entry in keep:
+            heapq.heappush(self.heap, entry)
+        return result
+
+    def _advance(self, current_start):
+        horizon = current_start - (self.n_buckets - 1) * self.bucket_seconds
+        while self.buckets and self.buckets[0][0] < horizon:
+            _, counts = self.buckets.popleft()
+            for post_id, count in counts.items():
+                # A later negative delta (an unlike) may already have zeroed the total.
+                self._set_total(post_id, self.totals.get(post_id, 0) - count)
+
+    def _set_total(self, post_id, total):
+        if total:
+            self.totals[post_id] = total
+            heapq.heappush(self.heap, (-total, post_id))
+        else:
+            self.totals.pop(post_id, None)
+
+
+class TrendingTracker:
+    """
+    Process-wide set of sliding windows.  With ``persist_seconds`` set, a daemon
+    thread (started on the first event, so each pre-forked worker gets its
+    own) calls ``persist`` on that interval; ``None`` leaves it to the caller.
+    """
+
+    def __init__(self, persist_seconds=PERSIST_SECONDS):
+        self.persist_seconds = persist_seconds
+        self.lock = threading.Lock()
+        self.windows = None
+        self.pending = {}           # (bucket_seconds, bucket_start, post_id) -> delta
+        self.last_persist = 0.0
+        self._persister = None
+
+    def record(self, post_id, amount, ts=None):
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            self._ensure_loaded()
+            for window in self.windows.values():
+                window.add(post_id, amount, ts)
+                key = (window.bucket_seconds, window.bucket_for(ts), post_id)
+                self.pending[key] = self.pending.get(key, 0) + amount
+            if self.persist_seconds is not None and self._persister is None:
+                self._persister = threading.Thread(target=self._persist_loop, name='trending-persist', daemon=True)
+                self._persister.start()
+                atexit.register(self.persist)
+
+    def top(self, window='hour', k=10, ts=None):
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            self._ensure_loaded()
+            return self.windows[window].top(k, ts)
+
+    def _persist_loop(self):
+        while True:
+            time.sleep(self.persist_seconds)
+            self.persist()
+
+    def persist(self):
+        """
+        Add pending deltas onto ``TrendingBucket`` rows and reload merged counts.
+        Returns ``False`` (after logging) if the write failed; the deltas are
+        kept for the next attempt.  Events keep flowing into memory meanwhile.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_persist = time.time()
+        try:
+            with transaction.atomic():
+                # Posts deleted since the event was counted are dropped here.
+                live = set(Post.objects.filter(pk__in={key[2] for key in pending})
+                           .values_list('pk', flat=True))
+                for (bucket_seconds, start, post_id), delta in pending.items():
+                    if delta and post_id in live:
+                        _add_to_bucket(post_id, bucket_seconds, _to_datetime(start), delta)
+                oldest = self.last_persist - max(span for span, _ in WINDOWS.values())
+                TrendingBucket.objects.filter(bucket_start__lt=_to_datetime(oldest)).delete()
+            windows = self._load_windows()
+        except Exception:
+            logger.exception('Persisting trending counters failed; retrying in %ss.', self.persist_seconds)
+            with self.lock:
+                for key, delta in pending.items():
+                    self.pending[key] = self.pending.get(key, 0) + delta
+            return False
+        with self.lock:
+            self.windows = windows
+            self._apply_pending()
+        return True
+
+    def reset(self):
+        with self.lock:
+            self.windows = None
+            self.pending = {}
+
+    def _ensure_loaded(self):
+        if self.windows is None:
+            self.windows = self._load_windows()
+            self._apply_pending()
+
+    @staticmethod
+    def _load_windows():
+        windows = {name: SlidingWindow(span, size) for name, (span, size) in WINDOWS.items()}
+        now = time.time()
+        for name, window in windows.items():
+            span = WINDOWS[name][0]
+            rows = (TrendingBucket.objects
+                    .filter(bucket_seconds=window.bucket_seconds,
+                            bucket_start__gte=_to_datetime(now - span))
+                    .order_by('bucket_start')
+                    .values_list('post_id', 'bucket_start', 'count'))
+            for post_id, start, count in rows:
+                window.add(post_id, count, start.timestamp())
+        return windows
+
+    def _apply_pending(self):
+        """Re-apply deltas that have not reached the table yet (caller holds ``lock``)."""
+        for (bucket_seconds, start, post_id), delta in sorted(self.pending.items(), key=lambda i: i[0][1]):
+            for window in self.windows.values():
+                if window.bucket_seconds == bucket_seconds:
+                    window.add(post_id, delta, start)
+
+
+def _add_to_bucket(post_id, bucket_seconds, bucket_start, delta):
+    lookup = {'post_id': post_id, 'bucket_seconds': bucket_seconds, 'bucket_start': bucket_start}
+    if TrendingBucket.objects.filter(**lookup).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            TrendingBucket.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Another worker created the row first; add onto it instead.
+        TrendingBucket.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def _to_datetime(ts):
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+tracker = TrendingTracker()
+
+
+def record_like(post_id, liked=True):
+    tracker.record(post_id, LIKE_WEIGHT if liked else -LIKE_WEIGHT)
+
+
+def record_comment(post_id):
+    tracker.record(post_id, COMMENT_WEIGHT)
+
+
+def top_posts(window='hour', k=10):
+    return tracker.top(window, k)
@@ -2,17 +2,25 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView, LoginView,
-    UserViewSet, PostViewSet, CommentViewSet, MessageViewSet
+    UserViewSet, PostViewSet, CommentViewSet, MessageViewSet,
+    NotificationViewSet, ThreadViewSet
 )
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'posts', PostViewSet, basename='post')
 router.register(r'comments', CommentViewSet, basename='comment')
 router.register(r'messages', MessageViewSet, basename='message')
+router.register(r'threads', ThreadViewSet, basename='thread')
+router.register(r'notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/login/', LoginView.as_view(), name='login'),
+    path('async/posts/feed/', async_views.feed, name='async-post-feed'),
+    path('async/posts/<int:pk>/', async_views.post_detail, name='async-post-detail'),
+    path('async/messages/', async_views.messages, name='async-message-list'),
+    path('async/messages/conversations/', async_views.conversations, name='async-message-conversations'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,15 +1,31 @@
-from rest_framework import viewsets, status, generics, permissions
+from rest_framework import viewsets, mixins, status, generics, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
+from django.db import transaction
 from django.db.models import Q
-from .models import Post, Like, Comment, Message
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from .models import Post, Like, Comment, Message, Notification, ThreadMessage
 from .serializers import (
     UserSerializer, PostSerializer, CommentSerializer,
-    MessageSerializer, RegisterSerializer, UserMiniSerializer
+    MessageSerializer, RegisterSerializer, UserMiniSerializer,
+    NotificationSerializer, NotificationMarkReadSerializer, ProfileSerializer, PostEditSerializer,
+    ThreadSerializer, ThreadDetailSerializer,
+    ThreadCreateSerializer, ThreadMembersSerializer, ThreadMessageSerializer, ThreadReadSerializer
 )
+from .pagination import (
+    NotificationCursorPagination, PostCursorPagination,
+    ThreadCursorPagination, ThreadMessageCursorPagination
+)
+from . import archive, editing, notifications, purge, ranking, rendering, threads, trending, writes
+from . import export as data_export
 
 User = get_user_model()
 
@@ -61,6 +77,14 @@ class UserViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return super().get_permissions()
 
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the account now; the data itself is purged in batches by `purge_accounts`."""
+        user = self.get_object()
+        if user != request.user and not request.user.is_staff:
+            return Response({'detail': 'You can only delete your own account.'}, status=status.HTTP_403_FORBIDDEN)
+        job = purge.enqueue_purge(user)
+        return Response({'purge_job': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=False, methods=['get', 'patch'], url_path='me')
     def me(self, request):
         if request.method == 'GET':
@@ -71,6 +95,13 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='me/export')
+    def export(self, request):
+        """Download everything the current user owns as gzip-compressed NDJSON."""
+        response = StreamingHttpResponse(data_export.iter_user_export(request.user), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{request.user.username}-export.ndjson.gz"'
+        return response
+
     @action(detail=False, methods=['get'], url_path='search')
     def search(self, request):
         q = request.query_params.get('q', '')
@@ -80,57 +111,196 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = UserMiniSerializer(users, many=True, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'], url_path='profile')
+    def profile(self, request, pk=None):
+        """Profile header plus the first page of the user's posts, in a fixed number of queries."""
+        user = self.get_object()
+        return Response({
+            'user': ProfileSerializer(user, context={'request': request}).data,
+            'posts': self._posts_page(request, user),
+        })
+
+    @action(detail=True, methods=['get'], url_path='posts')
+    def posts(self, request, pk=None):
+        """Further cursor pages of the user's posts (newest first)."""
+        return Response(self._posts_page(request, self.get_object()))
+
+    def _posts_page(self, request, user):
+        paginator = PostCursorPagination()
+        # Walks the (author, -created_at) index; only the cursor columns are loaded.
+        page = paginator.paginate_queryset(
+            Post.objects.filter(author=user).only('id', 'created_at'), request, view=self
+        )
+        paginator.base_url = request.build_absolute_uri(reverse('user-posts', args=[user.pk]))
+        return {
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'results': rendering.render_posts([post.pk for post in page], request),
+        }
+
+
+# ─── Write timing ─────────────────────────────────────────────────────────────
+
+class WriteTimingMixin:
+    """Reports the ``writes.run`` stats of this request in ``Server-Timing``."""
+    write_stats = None
+
+    def handle_exception(self, exc):
+        if isinstance(exc, writes.DatabaseBusy) and exc.stats is not None:
+            self.write_stats = exc.stats
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.write_stats is not None:
+            writes.add_server_timing(response, self.write_stats)
+        return response
+
 
 # ─── Post ViewSet ─────────────────────────────────────────────────────────────
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(WriteTimingMixin, viewsets.ModelViewSet):
     queryset = Post.objects.select_related('author').prefetch_related('comments__author', 'likes')
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        author = self.request.query_params.get('author')
+        if self.action == 'list' and author:
+            if not author.isdigit():
+                raise ValidationError({'author': 'Must be a user id.'})
+            queryset = queryset.filter(author_id=author)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Read path renders from value rows; see social/rendering.py.
+        post_ids = self.filter_queryset(self.get_queryset()).values_list('pk', flat=True)
+        page = self.paginate_queryset(post_ids)
+        if page is not None:
+            return self.get_paginated_response(rendering.render_posts(page, request))
+        return Response(rendering.render_posts(post_ids, request))
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        ranking.invalidate_candidates()
+
+    def update(self, request, *args, **kwargs):
+        """
+        PUT/PATCH ``content`` and/or ``image``; author only.  Send the ``version``
+        you edited as ``If-Match: "<version>"`` to get ``412`` instead of
+        overwriting a concurrent edit.  The response is the minimal
+        ``PostEditSerializer`` shape with the new version (also as ``ETag``).
+        """
+        post = get_object_or_404(Post.objects.only('id', 'author_id', 'image', 'version'), pk=kwargs['pk'])
+        if post.author_id != request.user.pk:
+            return Response({'detail': 'Not your post.'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = PostEditSerializer(post, data=request.data, partial=kwargs.get('partial', False))
+        serializer.is_valid(raise_exception=True)
+        expected = editing.parse_if_match(request.headers.get('If-Match'))
+        # Content edits don't change ranking inputs, so the feed candidate cache is left alone.
+        post = editing.edit_post(post, serializer.validated_data, expected)
+        response = Response(PostEditSerializer(post, context={'request': request}).data)
+        response['ETag'] = editing.etag(post.version)
+        return response
 
     def destroy(self, request, *args, **kwargs):
         post = self.get_object()
         if post.author != request.user:
             return Response({'detail': 'Not your post.'}, status=status.HTTP_403_FORBIDDEN)
-        post.delete()
+        with transaction.atomic():
+            likes = Like.objects.filter(post=post).count()
+            # Counters are adjusted here rather than in post_delete receivers, so
+            # the post's likes, comments and notifications go in bulk DELETEs.
+            post.delete()
+            purge.decrement_counters('posts_count', {post.author_id: 1})
+            purge.decrement_counters('likes_received_count', {post.author_id: likes})
+        ranking.invalidate_candidates()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @staticmethod
+    def _write_target(pk):
+        # Not get_object(): the viewset queryset prefetches every comment and like.
+        return get_object_or_404(Post.objects.select_related('author'), pk=pk)
+
     @action(detail=True, methods=['post'], url_path='like')
     def like(self, request, pk=None):
-        post = self.get_object()
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        if not created:
-            like.delete()
-            return Response({'liked': False, 'likes_count': post.likes.count()})
-        return Response({'liked': True, 'likes_count': post.likes.count()})
+        post = self._write_target(pk)
+
+        def toggle():
+            like, created = Like.objects.get_or_create(user=request.user, post=post)
+            if created:
+                notifications.notify(post.author, request.user, Notification.LIKE, post=post)
+            else:
+                like.delete()
+                purge.decrement_counters('likes_received_count', {post.author_id: 1})
+                notifications.retract(post.author, request.user, Notification.LIKE, post=post)
+            return created, Like.objects.filter(post=post).count()
+
+        (liked, likes_count), self.write_stats = writes.run(toggle)
+        trending.record_like(post.id, liked=liked)
+        return Response({'liked': liked, 'likes_count': likes_count})
 
     @action(detail=True, methods=['post'], url_path='comment')
     def comment(self, request, pk=None):
-        post = self.get_object()
+        post = self._write_target(pk)
         serializer = CommentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save(author=request.user, post=post)
+
+        def save():
+            serializer.save(author=request.user, post=post)
+            notifications.notify(post.author, request.user, Notification.COMMENT, post=post)
+
+        _, self.write_stats = writes.run(save)
+        trending.record_comment(post.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], url_path='feed')
     def feed(self, request):
-        posts = Post.objects.all()
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response(serializer.data)
+        """
+        Engagement-ranked feed (recent posts ranked, older ones after them);
+        ``?order=recent`` keeps plain chronological order.
+        """
+        if request.query_params.get('order') == 'recent':
+            post_ids = Post.objects.values_list('pk', flat=True)
+        else:
+            post_ids = ranking.feed_post_ids(request.user)
+        return Response(rendering.render_posts(post_ids, request))
+
+    @action(detail=False, methods=['get'], url_path='trending')
+    def trending(self, request):
+        """Top posts by likes + comments in the last ``?window=hour|day`` (default hour)."""
+        window = request.query_params.get('window', 'hour')
+        if window not in trending.WINDOWS:
+            return Response({'detail': f'window must be one of: {", ".join(trending.WINDOWS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        top = trending.top_posts(window, limit)
+        data = rendering.render_posts([post_id for post_id, _ in top], request)
+        scores = dict(top)
+        for item in data:
+            item['trending_score'] = scores[item['id']]
+        return Response(data)
 
 
 # ─── Comment ViewSet ──────────────────────────────────────────────────────────
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(WriteTimingMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        def save():
+            comment = serializer.save(author=self.request.user)
+            notifications.notify(comment.post.author, self.request.user, Notification.COMMENT, post=comment.post)
+            return comment
+
+        comment, self.write_stats = writes.run(save)
+        trending.record_comment(comment.post_id)
 
     def destroy(self, request, *args, **kwargs):
         comment = self.get_object()
@@ -142,7 +312,7 @@ class CommentViewSet(viewsets.ModelViewSet):
 
 # ─── Message ViewSet ──────────────────────────────────────────────────────────
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(WriteTimingMixin, viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
 
@@ -158,20 +328,148 @@ class MessageViewSet(viewsets.ModelViewSet):
             Q(sender=user) | Q(receiver=user)
         ).select_related('sender', 'receiver')
 
+    def list(self, request, *args, **kwargs):
+        """
+        With ``?with=<user id>``: one conversation, newest page first, in
+        chronological order. ``next`` (``?before=<id>``) scrolls further back and
+        reaches into the message archive only once the hot table is exhausted.
+        """
+        other_id = request.query_params.get('with')
+        if not other_id:
+            return super().list(request, *args, **kwargs)
+        before = request.query_params.get('before')
+        if not other_id.isdigit() or (before is not None and not before.isdigit()):
+            raise ValidationError({'detail': '"with" and "before" must be ids.'})
+        rows, next_before = archive.thread_page(
+            request.user.pk, int(other_id), int(before) if before else None, api_settings.PAGE_SIZE
+        )
+        next_url = None
+        if next_before is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), 'before', next_before)
+        return Response({
+            'next': next_url,
+            'results': [rendering.build_message(row, request) for row in rows],
+        })
+
     def perform_create(self, serializer):
-        serializer.save(sender=self.request.user)
+        def save():
+            message = serializer.save(sender=self.request.user)
+            notifications.notify(message.receiver, self.request.user, Notification.MESSAGE)
+
+        _, self.write_stats = writes.run(save)
 
     @action(detail=False, methods=['get'], url_path='conversations')
     def conversations(self, request):
         """Return list of users the current user has messaged."""
-        user = request.user
-        messages = Message.objects.filter(Q(sender=user) | Q(receiver=user))
-        user_ids = set()
-        for msg in messages:
-            if msg.sender_id != user.id:
-                user_ids.add(msg.sender_id)
-            if msg.receiver_id != user.id:
-                user_ids.add(msg.receiver_id)
-        users = User.objects.filter(id__in=user_ids)
+        users = User.objects.filter(id__in=archive.conversation_partner_ids(request.user.pk))
         serializer = UserMiniSerializer(users, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+
+# ─── Thread ViewSet (group conversations) ─────────────────────────────────────
+
+class ThreadViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Group threads the current user belongs to.  Objects are the user's own
+    ``ThreadMember`` rows, looked up by thread id, so non-members get a 404.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = ThreadCursorPagination
+    lookup_field = 'thread_id'
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        qs = threads.inbox(self.request.user)
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related('thread__members')
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ThreadCreateSerializer
+        if self.action == 'retrieve':
+            return ThreadDetailSerializer
+        return ThreadSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = ThreadCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        membership = threads.create_thread(
+            request.user,
+            [user.pk for user in serializer.validated_data['member_ids']],
+            serializer.validated_data['title'],
+        )
+        membership = self.get_queryset().prefetch_related('thread__members').get(pk=membership.pk)
+        return Response(ThreadDetailSerializer(membership, context={'request': request}).data,
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get', 'post'])
+    def messages(self, request, thread_id=None):
+        """GET: history, newest first (cursor-paginated). POST: send ``content``."""
+        membership = self.get_object()
+        if request.method == 'POST':
+            serializer = ThreadMessageSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            message = threads.post_message(membership, serializer.validated_data['content'])
+            return Response(ThreadMessageSerializer(message, context={'request': request}).data,
+                            status=status.HTTP_201_CREATED)
+
+        paginator = ThreadMessageCursorPagination()
+        qs = ThreadMessage.objects.filter(thread_id=membership.thread_id).select_related('sender')
+        page = paginator.paginate_queryset(qs, request, view=self)
+        return paginator.get_paginated_response(
+            ThreadMessageSerializer(page, many=True, context={'request': request}).data
+        )
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, thread_id=None):
+        """Move the read cursor to ``up_to`` (a message id) or the latest message."""
+        membership = self.get_object()
+        serializer = ThreadReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        last_read_id = threads.mark_read(membership, serializer.validated_data.get('up_to'))
+        return Response({'last_read_id': last_read_id})
+
+    @action(detail=True, methods=['post'])
+    def members(self, request, thread_id=None):
+        """Add ``member_ids`` to the thread; any member may invite."""
+        membership = self.get_object()
+        serializer = ThreadMembersSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        threads.add_members(membership.thread, [user.pk for user in serializer.validated_data['member_ids']])
+        membership = self.get_queryset().prefetch_related('thread__members').get(pk=membership.pk)
+        return Response(ThreadDetailSerializer(membership, context={'request': request}).data)
+
+    @action(detail=True, methods=['post'])
+    def leave(self, request, thread_id=None):
+        threads.leave(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ─── Notification ViewSet ─────────────────────────────────────────────────────
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
+
+    def get_queryset(self):
+        qs = Notification.objects.filter(recipient=self.request.user).select_related('last_actor')
+        # Unread only by default; ?all=1 includes already-read notifications.
+        if self.action == 'list' and not self.request.query_params.get('all'):
+            qs = qs.filter(is_read=False)
+        return qs
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread_count': request.user.unread_notifications_count})
+
+    @action(detail=False, methods=['post'], url_path='mark-read')
+    def mark_read(self, request):
+        """Mark the given ``ids`` as read, or everything when ``all`` is true."""
+        serializer = NotificationMarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        updated = notifications.mark_read(request.user, None if data['all'] else data['ids'])
+        request.user.refresh_from_db(fields=['unread_notifications_count'])
+        return Response({'marked': updated, 'unread_count': request.user.unread_notifications_count})
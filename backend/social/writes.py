@@ -0,0 +1,248 @@
+"""
+Request write units with optional batching.
+
+SQLite has one writer at a time: every commit takes the database lock, and a
+writer that cannot get it within the connection ``timeout`` fails with
+"database is locked".  Under a burst of comments on one post that lock, not
+the INSERT, is the bottleneck.
+
+Views hand their writes to ``run(fn)`` as one callable per request:
+
+* **Direct** (default) — ``fn`` runs in the request thread in its own
+  transaction: one lock acquisition and one commit per request.
+* **Batched** (``WRITE_BATCHING['ENABLED']``) — ``fn`` is queued for this
+  process's flusher thread, which collects whatever arrives within
+  ``WINDOW_MS`` (at most ``MAX_BATCH`` units) and runs it in one transaction,
+  each unit under its own savepoint so a failing unit doesn't sink the rest.
+  The request thread waits for its unit's result.
+
+Either way ``run`` returns ``(result, WriteStats)``; ``add_server_timing``
+reports the stats as ``Server-Timing: db-lock;dur=…, db-queue;dur=…,
+db-batch;desc="N"`` so ``manage.py loadtest_writes`` can read lock wait and
+commit counts from the responses.  Lock timeouts surface as ``503`` instead of
+a bare 500, still carrying ``Server-Timing`` with the time spent waiting.
+
+A batched unit that is still queued when its request times out is cancelled
+and never runs, so a client retrying after the ``503`` can't create a
+duplicate; one the flusher has already started is waited for, and its own
+outcome is returned.
+"""
+
+import queue
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'ENABLED': False,
+    'WINDOW_MS': 5,
+    'MAX_BATCH': 64,
+    'TIMEOUT': 30,
+}
+
+_WRITE_SQL = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+def config():
+    return {**DEFAULTS, **getattr(settings, 'WRITE_BATCHING', {})}
+
+
+class DatabaseBusy(APIException):
+    """``stats``: the ``WriteStats`` of the attempt, when known."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The database is busy; retry shortly.'
+    default_code = 'database_busy'
+
+    def __init__(self, stats=None):
+        super().__init__()
+        self.stats = stats
+
+
+def _is_lock_error(exc):
+    return isinstance(exc, OperationalError) and 'locked' in str(exc)
+
+
+class WriteStats:
+    """
+    ``lock_ms``: time in write statements and COMMIT — on SQLite almost all of
+    it is waiting for the database lock; for a write that timed out, the whole
+    time it waited before giving up.  ``queue_ms``: time the unit waited for
+    its batch.  ``batch``: units committed together (1 when direct).
+    """
+    __slots__ = ('lock_ms', 'queue_ms', 'batch')
+
+    def __init__(self, lock_ms=0.0, queue_ms=0.0, batch=1):
+        self.lock_ms = lock_ms
+        self.queue_ms = queue_ms
+        self.batch = batch
+
+    def server_timing(self):
+        return (f'db-lock;dur={self.lock_ms:.1f}, db-queue;dur={self.queue_ms:.1f}, '
+                f'db-batch;desc="{self.batch}"')
+
+
+def add_server_timing(response, stats):
+    existing = response.get('Server-Timing')
+    timing = stats.server_timing()
+    response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+    return response
+
+
+class _LockTimer:
+    """``execute_wrapper`` summing the time spent in write statements."""
+
+    def __init__(self):
+        self.ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _WRITE_SQL.match(sql):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.ms += (time.perf_counter() - started) * 1000
+
+
+def _transaction(units):
+    """Run ``units`` (callables) in one transaction; returns ``(results, lock_ms)``."""
+    timer = _LockTimer()
+    results = []
+    with connection.execute_wrapper(timer):
+        with transaction.atomic():
+            if len(units) == 1:
+                results.append(units[0]())
+            else:
+                for unit in units:
+                    try:
+                        with transaction.atomic():
+                            results.append(unit())
+                    except Exception as exc:
+                        results.append(_Failed(exc))
+            commit_started = time.perf_counter()
+    return results, timer.ms + (time.perf_counter() - commit_started) * 1000
+
+
+class _Failed:
+    __slots__ = ('exc',)
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+# ─── Batching ────────────────────────────────────────────────────────────────
+
+class _Pending:
+    """``started`` / ``cancelled`` are only changed under ``WriteBatcher._state_lock``."""
+    __slots__ = ('fn', 'queued_at', 'done', 'result', 'error', 'stats', 'started', 'cancelled')
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.queued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.stats = None
+        self.started = False
+        self.cancelled = False
+
+
+class WriteBatcher:
+    """Per-process queue drained by a daemon thread, one transaction per batch."""
+
+    def __init__(self, window_ms=5, max_batch=64, timeout=30):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    def submit(self, fn):
+        self._ensure_started()
+        pending = _Pending(fn)
+        self._queue.put(pending)
+        if not pending.done.wait(self.timeout):
+            with self._state_lock:
+                pending.cancelled = not pending.started
+            if pending.cancelled:
+                waited_ms = (time.perf_counter() - pending.queued_at) * 1000
+                raise DatabaseBusy(WriteStats(lock_ms=waited_ms, queue_ms=waited_ms))
+            # Already inside a transaction: report what actually happened to it.
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result, pending.stats
+
+    def _ensure_started(self):
+        # Started lazily so pre-forking servers get one flusher per worker.
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name='write-batcher', daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        with self._state_lock:
+            batch = [pending for pending in batch if not pending.cancelled]
+            for pending in batch:
+                pending.started = True
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            results, lock_ms = _transaction([pending.fn for pending in batch])
+        except Exception as exc:
+            results, lock_ms = [_Failed(exc)] * len(batch), 0.0
+        for pending, result in zip(batch, results):
+            pending.stats = WriteStats(lock_ms, (started - pending.queued_at) * 1000, len(batch))
+            if isinstance(result, _Failed):
+                pending.error = DatabaseBusy(pending.stats) if _is_lock_error(result.exc) else result.exc
+            else:
+                pending.result = result
+            pending.done.set()
+
+
+_batcher = None
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        conf = config()
+        _batcher = WriteBatcher(conf['WINDOW_MS'], conf['MAX_BATCH'], conf['TIMEOUT'])
+    return _batcher
+
+
+def run(fn):
+    """Run the write unit ``fn`` directly or batched; returns ``(result, WriteStats)``."""
+    if config()['ENABLED']:
+        return get_batcher().submit(fn)
+    started = time.perf_counter()
+    try:
+        results, lock_ms = _transaction([fn])
+    except OperationalError as exc:
+        if _is_lock_error(exc):
+            raise DatabaseBusy(WriteStats((time.perf_counter() - started) * 1000)) from exc
+        raise
+    return results[0], WriteStats(lock_ms)
@@ -1,12 +1,10 @@
 import React, { useEffect, useState } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useAuth } from '../App'
-import { getUser } from '../services/api'
+import { getProfile } from '../services/api'
 import PostCard from '../components/PostCard'
 import Avatar from '../components/Avatar'
 
-const BASE = 'http://localhost:8000'
-
 export default function ProfilePage() {
   const { id } = useParams()
   const { user: me } = useAuth()
@@ -21,15 +19,10 @@ export default function ProfilePage() {
 
   useEffect(() => {
     setLoading(true)
-    Promise.all([
-      getUser(id),
-      fetch(`${BASE}/api/posts/?author=${id}`, {
-        headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` }
-      }).then(r => r.json())
-    ])
-      .then(([u, postsData]) => {
+    getProfile(id)
+      .then(({ user: u, posts: postsPage }) => {
         setProfileUser(u)
-        setPosts(Array.isArray(postsData) ? postsData : postsData.results || [])
+        setPosts(postsPage.results || [])
       })
       .catch(console.error)
       .finally(() => setLoading(false))
@@ -79,7 +72,7 @@ export default function ProfilePage() {
             {profileUser.bio && <p className="profile-bio">{profileUser.bio}</p>}
             <div className="profile-counts">
               <div className="profile-count">
-                <div className="profile-count__num">{posts.length}</div>
+                <div className="profile-count__num">{profileUser.posts_count ?? posts.length}</div>
                 <div className="profile-count__label">Posts</div>
               </div>
               <div className="profile-count">
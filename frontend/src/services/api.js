@@ -60,6 +60,7 @@ export const updateProfile = (data) => {
 // ─── Users ────────────────────────────────────────────────────────────────────
 export const searchUsers = (q) => request(`/users/search/?q=${encodeURIComponent(q)}`)
 export const getUser = (id) => request(`/users/${id}/`)
+export const getProfile = (id) => request(`/users/${id}/profile/`)
 
 // ─── Posts ────────────────────────────────────────────────────────────────────
 export const getFeed = () => request('/posts/feed/')